@@ -0,0 +1,306 @@
+import datetime
+import numpy as np
+import periods
+import ytd_loader
+
+
+# period lengths, in units of the buckets' datetime64 dtype
+STEPS = {"hour": 1, "day": 1, "week": 7}
+# the sentinels parse_json.date_range has always returned for no ads
+EMPTY_RANGE = (datetime.date(2050, 1, 1), datetime.date(2000, 1, 1))
+
+
+class ImpressionTable:
+    '''
+    Columnar representation of the impressions in an ad-impressions file.
+    Advertisers, targeting types and targeting values are interned to integer
+    codes, in order of first appearance, so statistics reduce to NumPy
+    bincounts and reductions instead of loops over the original json dicts.
+
+    Attributes:
+        advertisers: a list of company handles, indexed by advertiser code
+        types: a list of targeting types, indexed by type code
+        values: a list of targeting values, indexed by value code
+        advertiser: an int32 array with one advertiser code per impression,
+            -1 where the impression has no screenName
+        time: a datetime64[s] array with the impressionTime of each
+            impression, parsed on first use so statistics that don't need
+            times don't pay for them
+        date: a datetime64[D] array with the day of each impression, also
+            computed on first use
+        matched: a bool array, whether each impression has a
+            matchedTargetingCriteria list
+        offsets: an int64 array of length len(self) + 1. The criteria of
+            impression i are entries offsets[i]:offsets[i + 1] of the
+            criteria columns below.
+        ttype: an int32 array with one targeting type code per criterion
+        tvalue: an int32 array with one targeting value code per criterion,
+            -1 where the criterion has no targetingValue
+    '''
+
+    def __init__(self, impressions = ()):
+        '''
+        Builds the table in a single pass over impressions.
+
+        Inputs:
+            impressions: an iterable of impression dictionaries
+        '''
+
+        advertisers = dict()
+        types = dict()
+        values = dict()
+        advertiser = []
+        times = []
+        matched = []
+        offsets = [0]
+        ttype = []
+        tvalue = []
+
+        for impression in impressions:
+            info = impression["advertiserInfo"]
+            if "screenName" in info:
+                advertiser.append(advertisers.setdefault(info["screenName"],
+                                                         len(advertisers)))
+            else:
+                advertiser.append(-1)
+            times.append(impression["impressionTime"])
+
+            criteria = impression.get("matchedTargetingCriteria")
+            matched.append(criteria is not None)
+            for target in criteria or ():
+                ttype.append(types.setdefault(target["targetingType"],
+                                              len(types)))
+                if "targetingValue" in target:
+                    tvalue.append(values.setdefault(target["targetingValue"],
+                                                    len(values)))
+                else:
+                    tvalue.append(-1)
+            offsets.append(len(ttype))
+
+        self.advertisers = list(advertisers)
+        self.types = list(types)
+        self.values = list(values)
+        self.advertiser = np.array(advertiser, dtype = np.int32)
+        self._times = times
+        self._time = None
+        self._date = None
+        self.matched = np.array(matched, dtype = bool)
+        self.offsets = np.array(offsets, dtype = np.int64)
+        self.ttype = np.array(ttype, dtype = np.int32)
+        self.tvalue = np.array(tvalue, dtype = np.int32)
+
+
+    @classmethod
+    def from_ads(cls, ads):
+        '''
+        Builds a table from an ad-impressions json.
+
+        Inputs:
+            ads: a readable json, the result of calling json.loads(f.read())
+
+        Outputs:
+            an ImpressionTable
+        '''
+
+        return cls(impression for ad in ads for impression in
+                   ad["ad"]["adsUserData"]["adImpressions"]["impressions"])
+
+
+    @classmethod
+    def from_file(cls, path):
+        '''
+        Builds a table by streaming an archive with
+        ytd_loader.iter_impressions, without materializing its json.
+
+        Inputs:
+            path: an ad-impressions file, or an archive's data directory
+
+        Outputs:
+            an ImpressionTable
+        '''
+
+        return cls(ytd_loader.iter_impressions(path))
+
+
+    def __len__(self):
+        return len(self.advertiser)
+
+
+    @property
+    def time(self):
+        if self._time is None:
+            self._time = np.array(self._times, dtype = "datetime64[s]")
+            self._times = None
+
+        return self._time
+
+
+    @property
+    def date(self):
+        if self._date is None:
+            self._date = self.time.astype("datetime64[D]")
+
+        return self._date
+
+
+    def criteria_owner(self):
+        '''
+        Maps every criterion back to its impression.
+
+        Outputs:
+            an int64 array with the impression index of each criterion
+        '''
+
+        return np.repeat(np.arange(len(self)), np.diff(self.offsets))
+
+
+    def categorizations(self):
+        '''
+        Counts targeting values per targeting type, see
+        parse_json.categorizations. Types and values keep their order of first
+        appearance.
+
+        Outputs:
+            a dictionary of dictionaries of integers
+        '''
+
+        has_value = self.tvalue >= 0
+        pairs = (self.ttype[has_value].astype(np.int64) * len(self.values)
+                 + self.tvalue[has_value])
+        codes, first, counts = np.unique(pairs, return_index = True,
+                                         return_counts = True)
+        order = np.argsort(first, kind = "stable")
+
+        all_matches = dict()
+        for code, n in zip(codes[order].tolist(), counts[order].tolist()):
+            ttype, tvalue = divmod(code, len(self.values))
+            all_matches.setdefault(self.types[ttype], dict())[self.values[tvalue]] = n
+
+        return all_matches
+
+
+    def count_companies(self):
+        '''
+        Counts impressions per advertiser, see parse_json.count_companies.
+
+        Outputs:
+            a dictionary of company handles to number of ads
+        '''
+
+        counts = np.bincount(self.advertiser[self.advertiser >= 0],
+                             minlength = len(self.advertisers))
+
+        return dict(zip(self.advertisers, counts.tolist()))
+
+
+    def num_unmatched(self):
+        '''
+        The number of impressions without matched targeting criteria.
+        '''
+
+        return len(self) - int(np.count_nonzero(self.matched))
+
+
+    def num_with_types(self, ttypes):
+        '''
+        Counts impressions with at least one criterion of the given types, see
+        parse_json.num_targeted.
+
+        Inputs:
+            ttypes: an iterable of targeting type strings
+
+        Outputs:
+            an integer
+        '''
+
+        codes = [self.types.index(t) for t in ttypes if t in self.types]
+        hits = np.isin(self.ttype, codes)
+        per_impression = np.bincount(self.criteria_owner()[hits],
+                                     minlength = len(self))
+
+        return int(np.count_nonzero(per_impression))
+
+
+    def avg_num_targeted(self):
+        '''
+        The average number of targeting criteria per impression.
+        '''
+
+        return len(self.ttype) / len(self)
+
+
+    def date_range(self):
+        '''
+        The first and last day an impression was seen.
+
+        Outputs:
+            a tuple of two datetime.date objects. Like parse_json.date_range,
+                a table without impressions gives (2050-01-01, 2000-01-01).
+        '''
+
+        if len(self) == 0:
+            return EMPTY_RANGE
+
+        return self.date.min().item(), self.date.max().item()
+
+
+    def buckets(self, freq):
+        '''
+        Truncates every impression time to the start of its period.
+
+        Inputs:
+            freq: "hour", "day" or "week". Weeks start on Monday.
+
+        Outputs:
+            a datetime64 array with one period start per impression
+        '''
+
+        if freq == "hour":
+            return self.time.astype("datetime64[h]")
+
+        return periods.truncate(self.date, freq, STEPS)
+
+
+    def histogram(self, freq = "day", by = None):
+        '''
+        Counts impressions per hour, day or week, optionally split by
+        advertiser or targeting type. Periods without impressions between the
+        first and last one are included with a count of 0.
+
+        Inputs:
+            freq: "hour", "day" or "week"
+            by: None, "advertiser" or "type". An impression counts once for
+                every distinct targeting type it matched.
+
+        Outputs:
+            if by is None, a tuple (bins, counts): a datetime64 array of period
+                starts and an int64 array of impressions per period.
+            otherwise, a tuple (bins, labels, counts), where labels is a list
+                of advertisers or targeting types and counts is an int64 array
+                of shape (len(labels), len(bins)). A table without impressions
+                has no bins.
+        '''
+
+        bins, period = periods.bin_index(self.buckets(freq), STEPS[freq])
+        num_bins = len(bins)
+
+        if by is None:
+            return bins, np.bincount(period, minlength = num_bins)
+
+        if by == "advertiser":
+            labels = self.advertisers
+            has_advertiser = self.advertiser >= 0
+            group = self.advertiser[has_advertiser]
+            period = period[has_advertiser]
+        elif by == "type":
+            labels = self.types
+            pairs = np.unique(self.criteria_owner() * len(labels) + self.ttype)
+            owner, group = np.divmod(pairs, len(labels))
+            period = period[owner]
+        else:
+            raise ValueError("by must be None, \"advertiser\" or \"type\"")
+
+        counts = np.bincount(group.astype(np.int64) * num_bins + period,
+                             minlength = len(labels) * num_bins)
+
+        return bins, labels, counts.reshape(len(labels), num_bins)
@@ -0,0 +1,168 @@
+import argparse
+import concurrent.futures
+import json
+import os
+import parse_json
+
+
+
+def find_archives(directory):
+    '''
+    Finds every archive in a directory of users' exports. An archive is
+    either an ad-impressions .js file, or a directory holding one (e.g. a
+    user's "data" directory).
+
+    Inputs:
+        directory: a directory with one entry per user export
+
+    Outputs:
+        a sorted list of archive paths
+    '''
+
+    archives = []
+
+    for entry in os.scandir(directory):
+        if entry.is_dir() or entry.name.endswith(".js"):
+            archives.append(entry.path)
+
+    return sorted(archives)
+
+
+def _error_record(path, e):
+    return {"archive": path, "result": None,
+            "error": "{}: {}".format(type(e).__name__, e)}
+
+
+def process_archive(path):
+    '''
+    Runs format_output_report on a single archive, never raising.
+
+    Inputs:
+        path: an archive path, as returned by find_archives
+
+    Outputs:
+        a dictionary with the archive path, and either the report's fields
+            (see reports.TwitterAdsReport) under "result" or a message under
+            "error".
+    '''
+
+    try:
+        result = parse_json.format_output_report(path).to_dict()
+    except Exception as e:
+        return _error_record(path, e)
+
+    return {"archive": path, "result": result, "error": None}
+
+
+def summarize(records):
+    '''
+    Combines per-archive records into a single summary.
+
+    Inputs:
+        records: a list of dictionaries returned by process_archive
+
+    Outputs:
+        a dictionary with overall counts, the errors by archive and every
+            archive's result
+    '''
+
+    results = {r["archive"]: r["result"] for r in records if r["error"] is None}
+    errors = {r["archive"]: r["error"] for r in records if r["error"] is not None}
+    total = sum(r["total"] for r in results.values())
+    tailored = sum(r["tailored"] for r in results.values())
+
+    return {
+        "archives": len(records),
+        "succeeded": len(results),
+        "failed": len(errors),
+        "total_ads": total,
+        "targeted_ads": sum(r["targeted"] for r in results.values()),
+        "tailored_ads": tailored,
+        "tailored_pct": tailored / total * 100 if total else 0.0,
+        "errors": errors,
+        "results": results,
+    }
+
+
+def _run_isolated(path):
+    '''
+    Reruns one archive in its own single-worker pool, so a worker crash is
+    recorded against the archive that caused it.
+    '''
+
+    try:
+        with concurrent.futures.ProcessPoolExecutor(max_workers = 1) as pool:
+            return pool.submit(process_archive, path).result()
+    except Exception as e:
+        return _error_record(path, e)
+
+
+def run_batch(directory, workers = None, summary_file = None):
+    '''
+    Runs format_output_report over every archive in a directory across a
+    process pool. Records are yielded as archives finish, in completion
+    order; an archive that fails yields a record with an error instead of
+    stopping the batch.
+
+    If a worker dies (e.g. it is killed for running out of memory), the pool
+    breaks and every archive still running or queued in it fails with
+    BrokenProcessPool. Those archives are rerun one at a time in fresh pools,
+    so only the archive that kills its worker again gets the error record.
+
+    Inputs:
+        directory: a directory with one entry per user export
+        workers: an integer, the number of worker processes. Defaults to the
+            number of CPUs.
+        summary_file: optional file name to write the combined summary (see
+            summarize) to as json once the batch is done, or stopped early.
+
+    Outputs:
+        a generator of dictionaries returned by process_archive
+    '''
+
+    records = []
+    broken = []
+
+    try:
+        with concurrent.futures.ProcessPoolExecutor(max_workers = workers) as pool:
+            futures = {pool.submit(process_archive, path): path
+                       for path in find_archives(directory)}
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    record = future.result()
+                except concurrent.futures.process.BrokenProcessPool:
+                    broken.append(futures[future])
+                    continue
+                except Exception as e:
+                    record = _error_record(futures[future], e)
+                records.append(record)
+                yield record
+
+        for path in sorted(broken):
+            record = _run_isolated(path)
+            records.append(record)
+            yield record
+    finally:
+        if summary_file is not None:
+            with open(summary_file, "w") as f:
+                # results hold datetime.dates, written in ISO format
+                json.dump(summarize(records), f, indent = 2, default = str)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description = "Summarize every Twitter archive in a directory.")
+    parser.add_argument("directory")
+    parser.add_argument("-w", "--workers", type = int, default = None)
+    parser.add_argument("-s", "--summary", default = "summary.json")
+    args = parser.parse_args()
+
+    for record in run_batch(args.directory, args.workers, args.summary):
+        if record["error"] is None:
+            print("ok    {}".format(record["archive"]))
+        else:
+            print("error {}: {}".format(record["archive"], record["error"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import time
+import tracemalloc
+
+import parse_json
+import parse_spotify
+import parse_tinder
+import parse_tumblr
+import synth
+import ytd_loader
+
+
+def twitter_cases(file_name):
+    ads = ytd_loader.load_part(file_name)
+    return [
+        ("ytd_loader.load_part", lambda: ytd_loader.load_part(file_name)),
+        ("parse_json.format_output", lambda: parse_json.format_output(file_name)),
+        ("parse_json.categorizations", lambda: parse_json.categorizations(ads)),
+        ("parse_json.count_companies", lambda: parse_json.count_companies(ads)),
+        ("parse_json.top_k_companies", lambda: parse_json.top_k_companies(ads, 10)),
+        ("parse_json.num_umatched", lambda: parse_json.num_umatched(ads)),
+        ("parse_json.num_targeted", lambda: parse_json.num_targeted(ads)),
+        ("parse_json.avg_num_targeted", lambda: parse_json.avg_num_targeted(ads)),
+        ("parse_json.date_range", lambda: parse_json.date_range(ads)),
+        ("parse_json.impression_histogram", lambda: parse_json.impression_histogram(ads)),
+    ]
+
+
+def spotify_cases(file_name):
+    history = parse_spotify.parse_stream(file_name)
+    artist = max(history, key = lambda a: len(history[a]))
+    return [
+        ("parse_spotify.parse_stream", lambda: parse_spotify.parse_stream(file_name)),
+        ("parse_spotify.find_amount_listened",
+         lambda: parse_spotify.find_amount_listened(history, artist)),
+        ("parse_spotify.artist_top_songs",
+         lambda: parse_spotify.artist_top_songs(history, artist)),
+        ("parse_spotify.top_artists", lambda: parse_spotify.top_artists(history)),
+    ]
+
+
+def tinder_cases(file_name):
+    return [
+        ("parse_tinder.count_matches", lambda: parse_tinder.count_matches(file_name)),
+    ]
+
+
+def tumblr_cases(file_name):
+    tumblr = parse_tumblr.load_file(file_name)
+    cases = [
+        ("parse_tumblr.load_file", lambda: parse_tumblr.load_file(file_name)),
+        ("parse_tumblr.summary_info", lambda: parse_tumblr.summary_info(file_name)),
+    ]
+    for name in ("parse_dashboard", "ads_summary", "last_active", "top_tags",
+                 "extract_crushes_str", "extract_crushers_str", "interests"):
+        fn = getattr(parse_tumblr, name)
+        cases.append(("parse_tumblr." + name, lambda fn = fn: fn(tumblr)))
+    return cases
+
+
+CASES = {
+    "twitter": twitter_cases,
+    "spotify": spotify_cases,
+    "tinder": tinder_cases,
+    "tumblr": tumblr_cases,
+}
+
+
+def measure(fn, repeat = 3):
+    '''
+    Times a function and measures the peak memory it allocates.
+
+    Inputs:
+        fn: a function of no arguments
+        repeat: an integer, the number of timed runs. The best is kept.
+
+    Outputs:
+        a dictionary with "seconds", the best wall time, and "peak_bytes",
+            the peak memory allocated during a separate traced run.
+    '''
+
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+
+    # tracing slows everything down, so memory gets its own run
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {"seconds": best, "peak_bytes": peak}
+
+
+def archive_directory(directory, kwargs):
+    '''
+    The directory synthetic archives written with the cardinality options
+    kwargs are kept in. synth.archive doesn't put the options in the file
+    name, so each configuration other than the defaults gets its own
+    subdirectory.
+    '''
+
+    if not kwargs:
+        return directory
+
+    return os.path.join(directory, "-".join("{}={}".format(key, kwargs[key])
+                                            for key in sorted(kwargs)))
+
+
+def run(directory, platforms = None, sizes = synth.SIZES, repeat = 3, **kwargs):
+    '''
+    Benchmarks every public function of the parsers on synthetic archives of
+    each size. Archives are generated on first use and reused afterwards.
+
+    Inputs:
+        directory: the directory to keep synthetic archives in
+        platforms: a list of platforms, every platform by default
+        sizes: a list of archive sizes
+        repeat: an integer, the number of timed runs per function
+        kwargs: cardinality options of the synth writers, as named by
+            synth.OPTIONS, e.g. advertisers = 50000. Each platform only gets
+            its own options.
+
+    Outputs:
+        a dictionary with run metadata and a list of results, one per
+            (function, size)
+    '''
+
+    results = []
+    options = {name: synth.options(name, kwargs)
+               for name in platforms or sorted(CASES)}
+
+    for name in platforms or sorted(CASES):
+        for size in sizes:
+            file_name = synth.archive(archive_directory(directory, options[name]),
+                                      name, size, **options[name])
+            for case, fn in CASES[name](file_name):
+                result = measure(fn, repeat)
+                result.update({"function": case, "size": size})
+                results.append(result)
+                print("{:40} {:>10} {:10.4f}s {:10.1f}MB".format(
+                    case, size, result["seconds"], result["peak_bytes"] / 2 ** 20))
+
+    return {
+        "date": datetime.datetime.now().isoformat(timespec = "seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "options": options,
+        "results": results,
+    }
+
+
+def compare(old, new):
+    '''
+    Compares two benchmark runs.
+
+    Inputs:
+        old, new: dictionaries returned by run, or loaded from saved results
+
+    Outputs:
+        a list of (function, size, time ratio, memory ratio) tuples for the
+            functions and sizes present in both runs. Ratios are new / old.
+    '''
+
+    before = {(r["function"], r["size"]): r for r in old["results"]}
+    rows = []
+
+    for r in new["results"]:
+        key = (r["function"], r["size"])
+        if key not in before:
+            continue
+        b = before[key]
+        rows.append((r["function"], r["size"],
+                     r["seconds"] / b["seconds"] if b["seconds"] else float("nan"),
+                     r["peak_bytes"] / b["peak_bytes"] if b["peak_bytes"] else float("nan")))
+
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Benchmark the parsers.")
+    parser.add_argument("-d", "--directory", default = "synthetic")
+    parser.add_argument("-p", "--platform", choices = sorted(CASES), action = "append")
+    parser.add_argument("-n", "--sizes", type = int, nargs = "+", default = list(synth.SIZES))
+    parser.add_argument("-r", "--repeat", type = int, default = 3)
+    parser.add_argument("-o", "--output", default = "bench_results.json")
+    parser.add_argument("-c", "--compare", help = "earlier results to compare against")
+    synth.add_options(parser)
+    args = parser.parse_args()
+
+    kwargs = {flag: getattr(args, flag) for flag in synth.OPTIONS}
+    results = run(args.directory, args.platform, args.sizes, args.repeat, **kwargs)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent = 2)
+
+    if args.compare and os.path.exists(args.compare):
+        with open(args.compare, "r") as f:
+            old = json.load(f)
+        for function, size, time_ratio, mem_ratio in compare(old, results):
+            print("{:40} {:>10} time x{:.2f} memory x{:.2f}".format(
+                function, size, time_ratio, mem_ratio))
+
+
+if __name__ == "__main__":
+    main()
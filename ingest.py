@@ -0,0 +1,199 @@
+import argparse
+import concurrent.futures
+import json
+import os
+import re
+import time
+
+import instrument
+import parse_json
+import parse_spotify
+import parse_tinder
+import parse_tumblr
+import spotify_table
+import ytd_loader
+
+
+PLATFORMS = ("twitter", "spotify", "tinder", "tumblr")
+EXECUTORS = {
+    "process": concurrent.futures.ProcessPoolExecutor,
+    "thread": concurrent.futures.ThreadPoolExecutor,
+}
+TUMBLR_HEADER = re.compile(rb'\s*\[\s*\{\s*"data"\s*:')
+
+
+def _is_tumblr(file_name):
+    with open(file_name, "rb") as f:
+        return TUMBLR_HEADER.match(f.read(64)) is not None
+
+
+def find_exports(bundle):
+    '''
+    Finds the export of each platform in a user's data-request bundle. The
+    bundle is searched recursively, and the first match of each platform in
+    sorted path order is kept:
+        twitter: a directory with ad_impressions parts, see ytd_loader
+        spotify: a directory with streaming-history parts, see spotify_table
+        tinder: a data.json file
+        tumblr: a .json file holding a list whose first object has "data"
+
+    Inputs:
+        bundle: a directory
+
+    Outputs:
+        a dictionary of platform names to paths, only for platforms found
+    '''
+
+    exports = dict()
+
+    for directory, subdirectories, files in os.walk(bundle):
+        subdirectories.sort()
+        if "twitter" not in exports and \
+                "ad_impressions" in ytd_loader.find_datasets(directory):
+            exports["twitter"] = directory
+        if "spotify" not in exports and spotify_table.find_history_files(directory):
+            exports["spotify"] = directory
+
+        for name in sorted(files):
+            path = os.path.join(directory, name)
+            if name == "data.json":
+                exports.setdefault("tinder", path)
+            elif name.endswith(".json") and "tumblr" not in exports and \
+                    _is_tumblr(path):
+                exports["tumblr"] = path
+
+    return exports
+
+
+def analyze_twitter(path, profiler):
+    return parse_json.format_output_report(path, profiler = profiler).to_dict()
+
+
+def analyze_spotify(path, profiler):
+    history = parse_spotify.parse_stream(path, profiler = profiler)
+
+    with instrument.stage(profiler, "ingest.spotify/top_artists"):
+        return {
+            "artists": len(history),
+            "tracks": sum(len(songs) for songs in history.values()),
+            "top_artists": parse_spotify.top_artists(history),
+        }
+
+
+def analyze_tinder(path, profiler):
+    return parse_tinder.count_matches_report(path, profiler = profiler).to_dict()
+
+
+def analyze_tumblr(path, profiler):
+    return parse_tumblr.summary_report(path, profiler = profiler).to_dict()
+
+
+ANALYZERS = {
+    "twitter": analyze_twitter,
+    "spotify": analyze_spotify,
+    "tinder": analyze_tinder,
+    "tumblr": analyze_tumblr,
+}
+
+
+def process_export(platform, path, executor = "process"):
+    '''
+    Loads and analyzes one platform's export, never raising.
+
+    Inputs:
+        platform: a key of ANALYZERS
+        path: the export path, as returned by find_exports
+        executor: the kind of worker this runs in, a key of EXECUTORS. Thread
+            workers share a process, so their cpu time is measured per thread.
+
+    Outputs:
+        a dictionary with the platform, the path, the wall and cpu seconds
+            taken, the timed stages, and either the analysis under "result"
+            or a message under "error"
+    '''
+
+    # tracemalloc is process-wide, so it can't separate concurrent threads
+    profiler = instrument.Profiler(trace_memory = False,
+                                   context = {"platform": platform})
+    cpu_time = time.thread_time if executor == "thread" else time.process_time
+    wall, cpu = time.perf_counter(), cpu_time()
+    record = {"platform": platform, "path": path, "result": None, "error": None}
+
+    try:
+        record["result"] = ANALYZERS[platform](path, profiler)
+    except Exception as e:
+        record["error"] = "{}: {}".format(type(e).__name__, e)
+
+    record["wall"] = time.perf_counter() - wall
+    record["cpu"] = cpu_time() - cpu
+    record["stages"] = [stage.to_dict() for stage in profiler.stages]
+
+    return record
+
+
+def ingest(bundle, workers = None, executor = "process", platforms = PLATFORMS):
+    '''
+    Detects the exports in a data-request bundle and analyzes them
+    concurrently, so one platform's file reads overlap with another's
+    parsing.
+
+    Inputs:
+        bundle: a directory holding a user's exports
+        workers: an integer, the pool size. Defaults to one worker per export.
+        executor: "process" or "thread". Processes let the parsers use
+            several cores; threads avoid the start-up cost for small bundles.
+        platforms: the platforms to look for
+
+    Outputs:
+        a dictionary with the bundle, the total wall seconds, the records of
+            process_export by platform, and the errors by platform
+    '''
+
+    exports = {platform: path for platform, path in find_exports(bundle).items()
+               if platform in platforms}
+    start = time.perf_counter()
+    records = dict()
+
+    if exports:
+        with EXECUTORS[executor](max_workers = workers or len(exports)) as pool:
+            futures = [pool.submit(process_export, platform, path, executor)
+                       for platform, path in exports.items()]
+            for future in concurrent.futures.as_completed(futures):
+                record = future.result()
+                records[record["platform"]] = record
+
+    return {
+        "bundle": bundle,
+        "wall": time.perf_counter() - start,
+        "platforms": {platform: records[platform]
+                      for platform in PLATFORMS if platform in records},
+        "errors": {platform: record["error"] for platform, record in records.items()
+                   if record["error"] is not None},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description = "Analyze every platform export in a data-request bundle.")
+    parser.add_argument("bundle")
+    parser.add_argument("-w", "--workers", type = int, default = None)
+    parser.add_argument("-e", "--executor", choices = sorted(EXECUTORS),
+                        default = "process")
+    parser.add_argument("-o", "--output", default = None)
+    args = parser.parse_args()
+
+    combined = ingest(args.bundle, args.workers, args.executor)
+
+    for platform, record in combined["platforms"].items():
+        status = "ok   " if record["error"] is None else "error"
+        print("{} {:8} {:8.3f}s  {}".format(status, platform, record["wall"],
+                                            record["error"] or record["path"]))
+    print("total    {:8.3f}s".format(combined["wall"]))
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(combined, f, indent = 2, default = str)
+
+
+if __name__ == "__main__":
+    main()
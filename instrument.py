@@ -0,0 +1,176 @@
+import json
+import os
+import socket
+import time
+import tracemalloc
+import uuid
+
+
+class Stage:
+    '''
+    Measurements of one stage of a report pipeline.
+
+    Attributes:
+        name: a string, e.g. "parse_json.format_output/load"
+        wall: a float, wall-clock seconds
+        cpu: a float, CPU seconds of this process
+        peak_bytes: an integer, the peak memory allocated during the stage
+            above what was allocated when it started, or None if memory
+            wasn't traced
+        records: an integer, the number of records the stage processed, or
+            None if it doesn't apply
+    '''
+
+    __slots__ = ("name", "wall", "cpu", "peak_bytes", "records",
+                 "_profiler", "_start", "_tracing")
+
+    def __init__(self, profiler, name):
+        self.name = name
+        self.wall = None
+        self.cpu = None
+        self.peak_bytes = None
+        self.records = None
+        self._profiler = profiler
+
+
+    def __enter__(self):
+        self._tracing = False
+        base = 0
+        if self._profiler.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._tracing = True
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        self._start = (time.perf_counter(), time.process_time(), base)
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb):
+        wall, cpu, base = self._start
+        self.wall = time.perf_counter() - wall
+        self.cpu = time.process_time() - cpu
+        if self._profiler.trace_memory:
+            self.peak_bytes = max(0, tracemalloc.get_traced_memory()[1] - base)
+            if self._tracing:
+                tracemalloc.stop()
+        self._profiler.record(self)
+        return False
+
+
+    def to_dict(self):
+        return {"stage": self.name, "wall": self.wall, "cpu": self.cpu,
+                "peak_bytes": self.peak_bytes, "records": self.records}
+
+
+class NullStage:
+    '''
+    Stand-in for Stage when instrumentation is off. Records nothing.
+    '''
+
+    __slots__ = ("records",)
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class Profiler:
+    '''
+    Opt-in instrumentation for the report pipelines. Pass one as the
+    profiler argument of format_output, summary_info, parse_stream or
+    count_matches, and it collects a Stage for each stage they run.
+
+    Stages are timed with perf_counter and process_time. If trace_memory is
+    set, peak memory is measured with tracemalloc, which slows the pipeline
+    down noticeably while it runs.
+    '''
+
+    def __init__(self, sink = None, trace_memory = True, context = None):
+        '''
+        Inputs:
+            sink: an optional file name. Every finished stage is appended to
+                it as a json line.
+            trace_memory: a boolean, whether to measure peak memory
+            context: an optional dictionary added to every json line, e.g.
+                {"user": ..., "job": ...}
+        '''
+
+        self.sink = sink
+        self.trace_memory = trace_memory
+        self.context = {"run": uuid.uuid4().hex, "host": socket.gethostname(),
+                        "pid": os.getpid()}
+        self.context.update(context or {})
+        self.stages = []
+
+
+    def stage(self, name):
+        '''
+        Returns a context manager measuring one stage. Set its records
+        attribute inside the block to report how many records were processed.
+        '''
+
+        return Stage(self, name)
+
+
+    def record(self, stage):
+        self.stages.append(stage)
+        if self.sink is not None:
+            line = dict(self.context, time = time.time(), **stage.to_dict())
+            with open(self.sink, "a") as f:
+                f.write(json.dumps(line) + "\n")
+
+
+    def to_dict(self):
+        '''
+        The run context and every stage, as a json-serializable dictionary.
+        '''
+
+        return {"context": self.context,
+                "stages": [stage.to_dict() for stage in self.stages]}
+
+
+    def totals(self):
+        '''
+        Sums the measurements of stages with the same name.
+
+        Outputs:
+            a dictionary of stage names to dictionaries with "calls", "wall",
+                "cpu", "peak_bytes" (the maximum) and "records"
+        '''
+
+        totals = dict()
+        for stage in self.stages:
+            t = totals.setdefault(stage.name, {"calls": 0, "wall": 0.0,
+                "cpu": 0.0, "peak_bytes": None, "records": None})
+            t["calls"] += 1
+            t["wall"] += stage.wall
+            t["cpu"] += stage.cpu
+            if stage.peak_bytes is not None:
+                t["peak_bytes"] = max(t["peak_bytes"] or 0, stage.peak_bytes)
+            if stage.records is not None:
+                t["records"] = (t["records"] or 0) + stage.records
+
+        return totals
+
+
+def stage(profiler, name):
+    '''
+    Measures a stage with profiler, or does nothing if profiler is None.
+
+    Inputs:
+        profiler: a Profiler, or None
+        name: a string naming the stage
+
+    Outputs:
+        a context manager, yielding an object with a settable records
+            attribute
+    '''
+
+    if profiler is None:
+        return NullStage()
+
+    return profiler.stage(name)
@@ -1,9 +1,17 @@
+import ad_table
+import concurrent.futures
 import json
-import queue
+import os
 import re
+import reports
+import result_cache
 import datetime
+import functools
+import instrument
 import PyPDF2
 import shutil
+import topk
+import ytd_loader
 
 
 def change_first_line(file_name):
@@ -15,6 +23,357 @@ def change_first_line(file_name):
         f.write(from_file)
     
     
+DATE = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
+TAILORED = ("Tailored audiences (lists)", "Tailored audiences (web)")
+
+
+def _day(impression_time):
+    '''
+    The datetime.date of an impressionTime string.
+    '''
+
+    im = DATE.findall(impression_time)[0]
+
+    return datetime.date(int(im[0]), int(im[1]), int(im[2]))
+
+
+class AdStats:
+    '''
+    Accumulates every statistic reported by format_output in a single pass
+    over the impressions of an ad-impressions file. Each impression is looked
+    at exactly once, no matter how many statistics are read off afterwards.
+
+    Attributes:
+        matches: a dictionary of dictionaries of integers, in the structure
+            {"targeting_type": {"targeting_value": number_of_appearances}}
+        companies: a dictionary of company handles to number of ads
+        total: an integer, the total number of ads seen
+        unmatched: an integer, the number of ads without matched criteria
+        targeted: an integer, the number of ads from tailored audience lists
+        num_targets: an integer, the total number of targeting criteria
+        first: a datetime.date object with the earliest seen ad
+        last: a datetime.date object with the latest seen ad
+        low_water: a string, the earliest impressionTime seen, "" if none
+        high_water: a string, the latest impressionTime seen, "" if none
+        at_high_water: an integer, the number of impressions seen at exactly
+            high_water, or None if unknown (state written before it was kept)
+        parts: a set of content hashes of the archive files already folded in
+            by update
+
+    AdStats form a monoid under merge, with AdStats() as the identity, so
+    statistics of separate archive parts can be computed independently and
+    combined. They round-trip through json with to_dict and from_dict.
+    '''
+
+    def __init__(self):
+        self.matches = dict()
+        self.companies = dict()
+        self.total = 0
+        self.unmatched = 0
+        self.targeted = 0
+        self.num_targets = 0
+        self.low_water = ""
+        self.high_water = ""
+        self.at_high_water = 0
+        self.parts = set()
+
+
+    def add(self, impression):
+        '''
+        Folds a single impression into the running statistics.
+
+        Inputs:
+            impression: a dictionary, one entry of an "impressions" list
+        '''
+
+        self.total += 1
+
+        advertiser = impression["advertiserInfo"]
+        if "screenName" in advertiser:
+            screen_name = advertiser["screenName"]
+            self.companies[screen_name] = self.companies.get(screen_name, 0) + 1
+
+        # impression times sort as strings, so only the earliest and latest
+        # are kept, and parsed when first and last are read
+        time = impression["impressionTime"]
+        if time > self.high_water:
+            self.high_water = time
+            self.at_high_water = 1
+        elif time == self.high_water and self.at_high_water is not None:
+            self.at_high_water += 1
+        if time < self.low_water or not self.low_water:
+            self.low_water = time
+
+        if "matchedTargetingCriteria" not in impression:
+            self.unmatched += 1
+            return
+
+        criteria = impression["matchedTargetingCriteria"]
+        self.num_targets += len(criteria)
+        tailored = False
+
+        for target in criteria:
+            ttype = target["targetingType"]
+            if ttype in TAILORED:
+                tailored = True
+            if "targetingValue" not in target:
+                continue
+            tvalue = target["targetingValue"]
+            if ttype not in self.matches:
+                self.matches[ttype] = dict()
+            self.matches[ttype][tvalue] = self.matches[ttype].get(tvalue, 0) + 1
+
+        if tailored:
+            self.targeted += 1
+
+
+    def consume(self, ads):
+        '''
+        Folds every impression of an ad-impressions json into the statistics.
+
+        Inputs:
+            ads: a readable json, the result of calling json.loads(f.read())
+
+        Outputs:
+            self, so calls can be chained
+        '''
+
+        for ad in ads:
+            self.extend(ad["ad"]["adsUserData"]["adImpressions"]["impressions"])
+
+        return self
+
+
+    def extend(self, impressions):
+        '''
+        Folds an iterable of impressions into the statistics, e.g. the
+        generator from ytd_loader.iter_impressions.
+
+        Inputs:
+            impressions: an iterable of impression dictionaries
+
+        Outputs:
+            self, so calls can be chained
+        '''
+
+        for impression in impressions:
+            self.add(impression)
+
+        return self
+
+
+    @property
+    def first(self):
+        if not self.low_water:
+            return ad_table.EMPTY_RANGE[0]
+
+        return _day(self.low_water)
+
+
+    @property
+    def last(self):
+        if not self.high_water:
+            return ad_table.EMPTY_RANGE[1]
+
+        return _day(self.high_water)
+
+
+    @property
+    def avg_targets(self):
+        '''
+        The average number of targeting criteria used per ad.
+        '''
+
+        return self.num_targets / self.total
+
+
+    def merge(self, other):
+        '''
+        Folds the statistics of another AdStats into this one.
+
+        Inputs:
+            other: an AdStats, computed over different impressions
+
+        Outputs:
+            self, so calls can be chained
+        '''
+
+        for ttype, values in other.matches.items():
+            matches = self.matches.setdefault(ttype, dict())
+            for tvalue, n in values.items():
+                matches[tvalue] = matches.get(tvalue, 0) + n
+        for screen_name, n in other.companies.items():
+            self.companies[screen_name] = self.companies.get(screen_name, 0) + n
+
+        self.total += other.total
+        self.unmatched += other.unmatched
+        self.targeted += other.targeted
+        self.num_targets += other.num_targets
+        self.low_water = min(filter(None, (self.low_water, other.low_water)),
+                             default = "")
+        if other.high_water > self.high_water:
+            self.at_high_water = other.at_high_water
+        elif other.high_water == self.high_water:
+            if self.at_high_water is None or other.at_high_water is None:
+                self.at_high_water = None
+            else:
+                self.at_high_water += other.at_high_water
+        self.high_water = max(self.high_water, other.high_water)
+        self.parts |= other.parts
+
+        return self
+
+
+    def __add__(self, other):
+        return AdStats().merge(self).merge(other)
+
+
+    def update(self, path):
+        '''
+        Folds in only what is new in an archive: part files whose contents
+        were already folded in are skipped without parsing, and of the rest
+        only impressions later than the stored high_water are counted.
+
+        Impression times only go down to the second, so a re-export can hold
+        new impressions from the high_water second itself. Of the impressions
+        at exactly high_water, the first at_high_water are taken to be the
+        ones already counted and skipped, and the rest are counted. State
+        that doesn't know at_high_water skips that whole second.
+
+        Inputs:
+            path: an ad-impressions file, or an archive's data directory
+
+        Outputs:
+            self, so calls can be chained
+        '''
+
+        if os.path.isdir(path):
+            files = ytd_loader.find_parts(path, "ad_impressions")
+        else:
+            files = [path]
+
+        mark = self.high_water
+        skip = self.at_high_water
+        new = AdStats()
+
+        for file_name in files:
+            digest = result_cache.content_hash(file_name)
+            if digest in self.parts:
+                continue
+            for impression in ytd_loader.iter_items(file_name, "impressions"):
+                time = impression["impressionTime"]
+                if time == mark:
+                    if skip is None:
+                        continue
+                    if skip > 0:
+                        skip -= 1
+                        continue
+                elif time <= mark:
+                    continue
+                new.add(impression)
+            new.parts.add(digest)
+
+        return self.merge(new)
+
+
+    def to_dict(self):
+        '''
+        Converts the statistics to a json-serializable dictionary.
+        '''
+
+        return {
+            "matches": self.matches,
+            "companies": self.companies,
+            "total": self.total,
+            "unmatched": self.unmatched,
+            "targeted": self.targeted,
+            "num_targets": self.num_targets,
+            "low_water": self.low_water,
+            "high_water": self.high_water,
+            "at_high_water": self.at_high_water,
+            "parts": sorted(self.parts),
+        }
+
+
+    @classmethod
+    def from_dict(cls, state):
+        '''
+        Rebuilds statistics from the output of to_dict.
+        '''
+
+        stats = cls()
+        stats.matches = state["matches"]
+        stats.companies = state["companies"]
+        stats.total = state["total"]
+        stats.unmatched = state["unmatched"]
+        stats.targeted = state["targeted"]
+        stats.num_targets = state["num_targets"]
+        stats.high_water = state["high_water"]
+        stats.at_high_water = state.get("at_high_water") if stats.total else 0
+        if "low_water" in state:
+            stats.low_water = state["low_water"]
+        elif stats.total:
+            # written before low_water was kept; the first day is all it had
+            stats.low_water = state["first"]
+        stats.parts = set(state["parts"])
+
+        return stats
+
+
+def update_stats(state_file, path):
+    '''
+    Incrementally updates stored statistics with a new or re-downloaded
+    archive, see AdStats.update.
+
+    Inputs:
+        state_file: a json file holding AdStats.to_dict, created if missing
+        path: an ad-impressions file, or an archive's data directory
+
+    Outputs:
+        the updated AdStats, which are also written back to state_file
+    '''
+
+    if os.path.exists(state_file):
+        with open(state_file, "r") as f:
+            stats = AdStats.from_dict(json.load(f))
+    else:
+        stats = AdStats()
+
+    stats.update(path)
+
+    with open(state_file, "w") as f:
+        json.dump(stats.to_dict(), f)
+
+    return stats
+
+
+def _table(ads):
+    '''
+    The ImpressionTable passed in place of the json, or None. Building a
+    table costs more than one pass over the json, so the statistics below
+    answer from the table when they are given one, and loop over the json
+    otherwise. To compute several statistics of the same archive, build the
+    table once with ad_table.ImpressionTable.from_ads (or from_file) and pass
+    it instead of the json.
+
+    Inputs:
+        ads: a readable json, or an ad_table.ImpressionTable
+
+    Outputs:
+        an ad_table.ImpressionTable, or None
+    '''
+
+    if isinstance(ads, ad_table.ImpressionTable):
+        return ads
+
+    return None
+
+
+def _impressions(ads):
+    for ad in ads:
+        yield from ad["ad"]["adsUserData"]["adImpressions"]["impressions"]
+
+
 def categorizations(ads):
     '''
     Takes an ad-impressions.json and returns a dictionary of dictionaries in 
@@ -23,28 +382,28 @@ def categorizations(ads):
     number of times.
 
     Inputs:
-        ads: a readable json, the result of calling json.loads(f.read())
+        ads: a readable json, the result of calling json.loads(f.read()), or
+            an ad_table.ImpressionTable, see _table
 
     Outputs: 
         A dictionary of dictionaries of integers, as described above.
     '''
+
+    table = _table(ads)
+    if table is not None:
+        return table.categorizations()
+
     all_matches = dict()
 
-    for ad in ads:
-        ad_list = ad["ad"]["adsUserData"]["adImpressions"]["impressions"]
-        for impression in ad_list:
-            if "matchedTargetingCriteria" not in impression.keys():
+    for impression in _impressions(ads):
+        for target in impression.get("matchedTargetingCriteria", ()):
+            if "targetingValue" not in target:
                 continue
-            criteria = impression["matchedTargetingCriteria"]
-
-            for target in criteria:
-                ttype = target["targetingType"]
-                if "targetingValue" not in target.keys():
-                    continue
-                tvalue = target["targetingValue"]
-                if ttype not in all_matches.keys():
-                    all_matches[ttype] = dict()
-                all_matches[ttype][tvalue] = all_matches[ttype].get(tvalue, 0) + 1
+            ttype = target["targetingType"]
+            tvalue = target["targetingValue"]
+            if ttype not in all_matches:
+                all_matches[ttype] = dict()
+            all_matches[ttype][tvalue] = all_matches[ttype].get(tvalue, 0) + 1
 
     return all_matches
 
@@ -99,24 +458,7 @@ def top_k_matches(matched_dict, k):
     top_matches = dict()
 
     for match_type, val in matched_dict.items():
-        top_k = queue.PriorityQueue(maxsize = k)
-        subgroup_topk = dict()
-
-        for match, n in val.items():
-            if not top_k.full():
-                top_k.put((n, match))
-            else:
-                low, name_low = top_k.get()
-                if n > low:
-                    top_k.put((n, match))
-                else:
-                    top_k.put((low, name_low))
-
-        while not top_k.empty():
-            top_val, top_name = top_k.get()
-            subgroup_topk[top_name] = top_val
-
-        top_matches[match_type] = subgroup_topk
+        top_matches[match_type] = top_k_counts(val, k)
 
     return top_matches
 
@@ -126,7 +468,8 @@ def num_umatched(ads):
     Finds the number of ads without matched targeting criteria.
 
     Inputs:
-        ads: a readable json, the result of calling json.loads(f.read())
+        ads: a readable json, the result of calling json.loads(f.read()), or
+            an ad_table.ImpressionTable, see _table
 
     Outputs:
         a tuple. The first element of the tuple is the total number of ads in 
@@ -134,15 +477,17 @@ def num_umatched(ads):
             unmatched ads in the ad impressions file.
     '''
 
+    table = _table(ads)
+    if table is not None:
+        return (len(table), table.num_unmatched())
+
     total_unmatched = 0
     total_ads = 0
 
-    for ad in ads:
-        ad_list = ad["ad"]["adsUserData"]["adImpressions"]["impressions"]
-        for impression in ad_list:
-            total_ads += 1
-            if "matchedTargetingCriteria" not in impression.keys():
-                total_unmatched += 1
+    for impression in _impressions(ads):
+        total_ads += 1
+        if "matchedTargetingCriteria" not in impression:
+            total_unmatched += 1
 
     return (total_ads, total_unmatched)
 
@@ -152,56 +497,110 @@ def count_companies(ads):
     Counts the number of times a company advertised to a user.
 
     Inputs:
-        ads: a readable json, the result of calling json.loads(f.read())
+        ads: a readable json, the result of calling json.loads(f.read()), or
+            an ad_table.ImpressionTable, see _table
 
     Outputs:
         A dictionary, where keys are company handles and values are the number
             of times that company advertised to a specific user.
     '''
 
+    table = _table(ads)
+    if table is not None:
+        return table.count_companies()
+
     companies = dict()
 
-    for ad in ads:
-        ad_list = ad["ad"]["adsUserData"]["adImpressions"]["impressions"]
-        for impression in ad_list:
-            if "screenName" in impression["advertiserInfo"].keys():
-                screen_name = impression["advertiserInfo"]["screenName"]
-                companies[screen_name] = companies.get(screen_name, 0) + 1
+    for impression in _impressions(ads):
+        if "screenName" in impression["advertiserInfo"]:
+            screen_name = impression["advertiserInfo"]["screenName"]
+            companies[screen_name] = companies.get(screen_name, 0) + 1
+
+    return companies
+
 
-    return companies 
+def top_k_counts(counts, k):
+    '''
+    Takes a dictionary of counts and returns only the top k entries.
 
+    Inputs:
+        counts: a dictionary, where values are integer counts
+        k: an integer, the desired number of top entries to show.
 
-def top_k_companies(ads, k):
+    Outputs:
+        a dictionary in the same structure as counts, only showing the top k
+            entries.
+    '''
+
+    # smallest first, like draining a min-priority queue
+    return {name: count for count, name in reversed(topk.top_k(counts, k))}
+
+
+def top_k_companies(ads, k, capacity = None):
     '''
     Takes a company dictionary and returns the top k advertising companies
 
     Inputs:
-        ads: a readable json, the result of calling json.loads(f.read())
+        ads: a readable json, the result of calling json.loads(f.read()), or
+            an ad_table.ImpressionTable, see _table
         k: an integer, the desired number of top companies to show.
+        capacity: an optional integer. If given, companies are counted
+            approximately with a Space-Saving sketch tracking at most capacity
+            companies, instead of exactly. ads is already in memory, so this
+            only bounds the counts; see approx_top_targeting for a streaming
+            version.
 
     Outputs:
         a company_dict, only showing the top k companies.
     '''
 
-    top_k = queue.PriorityQueue(maxsize = k)
-    top_companies = dict()
-    company_dict = count_companies(ads)
+    if capacity is None:
+        return top_k_counts(count_companies(ads), k)
 
-    for comp, count in company_dict.items():
-        if not top_k.full():
-            top_k.put((count, comp))
-        else:
-            low_count, low_comp = top_k.get()
-            if count > low_count:
-                top_k.put((count, comp))
-            else:
-                top_k.put((low_count, low_comp))
+    sketch = topk.SpaceSaving(capacity)
+    table = _table(ads)
+    if table is not None:
+        sketch.update(table.advertisers[code] for code in table.advertiser.tolist()
+                      if code >= 0)
+    else:
+        for impression in _impressions(ads):
+            if "screenName" in impression["advertiserInfo"]:
+                sketch.add(impression["advertiserInfo"]["screenName"])
 
-    while not top_k.empty():
-        top_count, top_comp = top_k.get()
-        top_companies[top_comp] = top_count
+    return {name: count for count, name in reversed(sketch.top(k))}
 
-    return top_companies
+
+def approx_top_targeting(path, k, capacity):
+    '''
+    Approximate top k targeting values of each targeting type, streamed from
+    an archive in bounded memory: impressions are read one at a time with
+    ytd_loader.iter_impressions, and each targeting type keeps a Space-Saving
+    sketch of at most capacity values.
+
+    Inputs:
+        path: an ad-impressions file, or an archive's data directory
+        k: an integer, the desired number of top values per targeting type
+        capacity: an integer, the values tracked per targeting type. Should
+            be comfortably larger than k.
+
+    Outputs:
+        a dictionary in the structure of top_k_matches. Counts are upper
+            bounds on the true counts, see topk.SpaceSaving.
+    '''
+
+    sketches = dict()
+
+    for impression in ytd_loader.iter_impressions(path):
+        for target in impression.get("matchedTargetingCriteria", ()):
+            if "targetingValue" not in target:
+                continue
+            ttype = target["targetingType"]
+            if ttype not in sketches:
+                sketches[ttype] = topk.SpaceSaving(capacity)
+            sketches[ttype].add(target["targetingValue"])
+
+    return {ttype: {name: count for count, name in reversed(sketch.top(k))}
+            for ttype, sketch in sketches.items()}
 
 
 def date_range(ads):
@@ -209,29 +608,46 @@ def date_range(ads):
     Computes the first and last ad seen in the ad-impressions data.
 
     Inputs:
-        ads: a readable json, the result of calling json.loads(f.read())
+        ads: a readable json, the result of calling json.loads(f.read()), or
+            an ad_table.ImpressionTable, see _table
 
     Outputs:
         first: a datetime.date object with the earliest seen ad.
         last: a datetime.date object with the latest seen ad.
     '''
 
-    last = datetime.date(2000, 1, 1)
-    first = datetime.date(2050, 1, 1)
-    DATE = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
+    table = _table(ads)
+    if table is not None:
+        return table.date_range()
 
-    for ad in ads:
-        ad_list = ad["ad"]["adsUserData"]["adImpressions"]["impressions"]
-        for ad in ad_list:
-            im = DATE.findall(ad["impressionTime"])[0]
-            im = [int(i) for i in im]
-            time = datetime.date(im[0], im[1], im[2])
-            if time > last:
-                last = time
-            elif time < first:
-                first = time
+    times = [impression["impressionTime"] for impression in _impressions(ads)]
+    if not times:
+        return ad_table.EMPTY_RANGE
+
+    # impression times sort as strings, so only the endpoints are parsed
+    return _day(min(times)), _day(max(times))
+
+
+def impression_histogram(ads, freq = "day", by = None):
+    '''
+    Counts the ads seen per hour, day or week.
+
+    Inputs:
+        ads: a readable json, the result of calling json.loads(f.read()), or
+            an ad_table.ImpressionTable, see _table
+        freq: "hour", "day" or "week"
+        by: None, or "advertiser" or "type" to split the counts by advertiser
+            or targeting type
+
+    Outputs:
+        see ad_table.ImpressionTable.histogram
+    '''
+
+    table = _table(ads)
+    if table is None:
+        table = ad_table.ImpressionTable.from_ads(ads)
 
-    return first, last
+    return table.histogram(freq, by)
 
 
 def num_targeted(ads):
@@ -240,25 +656,25 @@ def num_targeted(ads):
     are on a tailored audience list.
 
     Inputs:
-        ads: a readable json, the result of calling json.loads(f.read())
+        ads: a readable json, the result of calling json.loads(f.read()), or
+            an ad_table.ImpressionTable, see _table
 
     Outputs:
         num_targeted: an approximate count of the number of ads that put you on
             a tailored audience list.
     '''
 
+    table = _table(ads)
+    if table is not None:
+        return table.num_with_types(TAILORED)
+
     num_targeted = 0
 
-    for ad in ads:
-        ad_list = ad["ad"]["adsUserData"]["adImpressions"]["impressions"]
-        for ad in ad_list:
-            if "matchedTargetingCriteria" in ad.keys():
-                for match in ad["matchedTargetingCriteria"]:
-                    if match["targetingType"] == "Tailored audiences (lists)" or \
-                        match["targetingType"] == "Tailored audiences (web)":
-                        num_targeted += 1
-                        break
-                        
+    for impression in _impressions(ads):
+        for target in impression.get("matchedTargetingCriteria", ()):
+            if target["targetingType"] in TAILORED:
+                num_targeted += 1
+                break
 
     return num_targeted
 
@@ -268,26 +684,107 @@ def avg_num_targeted(ads):
     Finds the average number of targeting criteria used per ad.
 
     Inputs:
-        ads: a readable json, the result of calling json.loads(f.read())
+        ads: a readable json, the result of calling json.loads(f.read()), or
+            an ad_table.ImpressionTable, see _table
 
     Outputs:
         a float, the average number of targeting criteria used per ad.
     '''
 
+    table = _table(ads)
+    if table is not None:
+        return table.avg_num_targeted()
+
     total_num_ads = 0
     total_num_targets = 0
 
-    for ad in ads:
-        ad_list = ad["ad"]["adsUserData"]["adImpressions"]["impressions"]
-        for ad in ad_list:
-            total_num_ads += 1
-            if "matchedTargetingCriteria" in ad.keys():
-                total_num_targets += len(ad["matchedTargetingCriteria"])
+    for impression in _impressions(ads):
+        total_num_ads += 1
+        total_num_targets += len(impression.get("matchedTargetingCriteria", ()))
 
     return total_num_targets / total_num_ads
 
 
-def match_tailored(advertiser_file, matched_dict):
+AT_PAT_0 = re.compile(r"these audiences\.(.+)")
+AT_PAT_1 = re.compile(r"(@\w+)")
+PAGES_PER_TASK = 8
+# advertiser pdfs whose handles are kept in memory
+HANDLES_CACHE_SIZE = 32
+
+
+def extract_pages(advertiser_file, pages):
+    '''
+    Extracts the text of some pages of a pdf.
+
+    Inputs:
+        advertiser_file: a pdf file name
+        pages: an iterable of page numbers
+
+    Outputs:
+        a list of strings, the text of each page
+    '''
+
+    with open(advertiser_file, "rb") as pdf:
+        pdfr = PyPDF2.PdfReader(pdf)
+        return [pdfr.pages[page].extract_text() for page in pages]
+
+
+def advertiser_handles(advertiser_file, workers = None, cache = None):
+    '''
+    Extracts every @handle from the "twitter_advertiser_list" pdf. Pages are
+    split across a process pool, and the handles of the last
+    HANDLES_CACHE_SIZE pdfs are remembered (by path, size and mtime) so
+    repeated calls don't extract the pdf again.
+
+    Inputs:
+        advertiser_file: "twitter_advertiser_list" pdf file name
+        workers: an integer, the number of worker processes. Defaults to the
+            number of CPUs, 1 extracts in this process.
+        cache: an optional result_cache.ResultCache to also keep the handles
+            across runs.
+
+    Outputs:
+        a list of handle strings, in page order
+    '''
+
+    st = os.stat(advertiser_file)
+
+    return list(_remembered_handles(os.path.abspath(advertiser_file), st.st_size,
+                                    st.st_mtime_ns, workers, cache))
+
+
+@functools.lru_cache(maxsize = HANDLES_CACHE_SIZE)
+def _remembered_handles(advertiser_file, size, mtime, workers, cache):
+    # size and mtime are only part of the key, so an edited pdf misses
+    return tuple(result_cache.cached(cache, "parse_json.advertiser_handles/v1",
+        advertiser_file, lambda: _advertiser_handles(advertiser_file, workers)))
+
+
+def _advertiser_handles(advertiser_file, workers):
+    with open(advertiser_file, "rb") as pdf:
+        num_pages = len(PyPDF2.PdfReader(pdf).pages)
+
+    # the last page has no handles
+    chunks = [range(start, min(start + PAGES_PER_TASK, num_pages - 1))
+              for start in range(0, num_pages - 1, PAGES_PER_TASK)]
+
+    if workers == 1 or len(chunks) <= 1:
+        texts = [extract_pages(advertiser_file, chunk) for chunk in chunks]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers = workers) as pool:
+            texts = list(pool.map(extract_pages,
+                                  [advertiser_file] * len(chunks), chunks))
+
+    ats = []
+    for page, text in enumerate(text for chunk in texts for text in chunk):
+        if page == 0:
+            text = AT_PAT_0.findall(text)[0]
+        ats.extend(AT_PAT_1.findall(text))
+
+    return ats
+
+
+def match_tailored(advertiser_file, matched_dict, workers = None, cache = None):
     '''
     Compares twitter's front-end view of who you are a similar audience to
     to the backend "Follower Look-alikes" list you are on.
@@ -296,82 +793,103 @@ def match_tailored(advertiser_file, matched_dict):
         advertiser_file: "twitter_advertiser_list" pdf file name
         matched_dict: a dictionary of dictionaries of integers, the output of
             the categorizations function.
+        workers, cache: passed on to advertiser_handles
 
     Outputs:
-        the disimilarities between the frontend and backend
+        a tuple of three lists: the handles only on the frontend, only on the
+            backend, and on both
     '''
 
-    ats = []
-    AT_PAT_0 = re.compile(r"these audiences\.(.+)")
-    AT_PAT_1 = re.compile(r"(@\w+)")
+    ats = advertiser_handles(advertiser_file, workers, cache)
     look_alikes = matched_dict["Follower look-alikes"].keys()
+    frontend = set(ats)
+    backend = set(look_alikes)
 
-    pdf = open(advertiser_file, "rb")
-    pdfr = PyPDF2.PdfFileReader(pdf) 
-
-    for page in range(pdfr.numPages - 1):
-        pg = pdfr.getPage(page)
-        text = pg.extractText()
-        if page == 0:
-            text = AT_PAT_0.findall(text)[0]
-        new_ats = AT_PAT_1.findall(text)
-        ats.extend(new_ats)
-
-    only_frontend = [i for i in ats if i not in look_alikes]
-    only_backend = [i for i in look_alikes if i not in ats]
-    both = [i for i in ats if i in look_alikes]
+    only_frontend = [i for i in ats if i not in backend]
+    only_backend = [i for i in look_alikes if i not in frontend]
+    both = [i for i in ats if i in backend]
 
-    return only_frontend, only_backend
+    return only_frontend, only_backend, both
 
 
-def format_output(file_name):
+def stream_stats(file_name, profiler = None):
     '''
-    Takes an ad-impressions file and prints summary info about the file.
+    Streams an ad-impressions archive into AdStats, one impression at a time,
+    so memory stays flat however large the archive is.
 
     Inputs:
-        file_name: name of the ad-impressions.js file
+        file_name: an ad-impressions file, or an archive's data directory
+        profiler: an optional instrument.Profiler
 
     Outputs:
-        None, just prints summary info.
+        an AdStats
     '''
 
-    change_first_line(file_name)
+    # parsing and aggregating are interleaved, so they make up one stage
+    with instrument.stage(profiler, "parse_json.format_output/stream") as stage:
+        stats = AdStats().extend(ytd_loader.iter_impressions(file_name))
+        stage.records = stats.total
 
-    with open(file_name, "r") as f:
-        ads = json.loads(f.read())
+    return stats
 
-    matched_dict = categorizations(ads)
-    top_matches = top_k_matches(matched_dict, 5)
-    top_companies = top_k_companies(ads, 10)
-    total, unmatched = num_umatched(ads)
-    targeted = num_targeted(ads)
-    avg = avg_num_targeted(ads)
-    first, last = date_range(ads)
-    first = "{} {}, {}".format(first.strftime("%B"), first.day, first.year)
-    last = "{} {}, {}".format(last.strftime("%B"), last.day, last.year)
 
+def format_output_report(file_name, cache = None, profiler = None):
     '''
-    a = ("From {} to {}, there were {} targeted ads in your data ({} total)."
-        " On average, each ad had {:.2f} targeting criteria."
-        " Of those, advertisers wanted to reach you the most in the following "
-        "categories: \n \n").format(first, last, total - unmatched, total, avg)
+    Takes an ad-impressions file and collects summary info about the file.
 
-    b = ("Interests: {} \n \nFollower look-alikes: {} \n \nEvents: {} \n \n" 
-        "Keywords: {} \n \nBehaviors: {} \n \n").format(
-        top_matches["Interests"],\
-        top_matches["Follower look-alikes"], top_matches["Events"], \
-        top_matches["Keywords"], top_matches["Behaviors"])
-
-    c = "The top 10 companies advertising to you were {}".format(top_companies)
+    Inputs:
+        file_name: name of the ad-impressions.js file, or an archive's data
+            directory to read every ad_impressions part in it
+        cache: an optional result_cache.ResultCache. On a hit the parsed
+            statistics are read from the cache instead of the archive.
+        profiler: an optional instrument.Profiler to time each stage
 
-    d = ("\n \nThere were approximately {} ads targeted to you from tailored"
-        " audience lists, making up {:.2f}% of all ads you saw").format(targeted, targeted/total*100)
+    Outputs:
+        a reports.TwitterAdsReport
     '''
 
-    f.close()
+    stats = result_cache.cached(cache, "parse_json.AdStats/v3", file_name,
+        lambda: stream_stats(file_name, profiler))
+
+    with instrument.stage(profiler, "parse_json.format_output/top_k") as stage:
+        top_matches = top_k_matches(stats.matches, 5)
+        top_companies = top_k_counts(stats.companies, 10)
+        stage.records = len(stats.companies) + sum(len(v) for v in stats.matches.values())
+
+    with instrument.stage(profiler, "parse_json.format_output/format"):
+        report = reports.TwitterAdsReport(
+            first = stats.first,
+            last = stats.last,
+            targeted = stats.total - stats.unmatched,
+            total = stats.total,
+            avg_targets = stats.avg_targets,
+            interests = top_matches["Interests"],
+            follower_lookalikes = top_matches["Follower look-alikes"],
+            events = top_matches["Events"],
+            keywords = top_matches["Keywords"],
+            behaviors = top_matches["Behaviors"],
+            top_companies = top_companies,
+            tailored = stats.targeted,
+            tailored_percent = stats.targeted / stats.total * 100)
+
+    return report
+
+
+def format_output(file_name, cache = None, profiler = None):
+    '''
+    Takes an ad-impressions file and prints summary info about the file.
 
-    return first, last, total - unmatched, total, avg, top_matches["Interests"], \
-        top_matches["Follower look-alikes"], top_matches["Events"], top_matches["Keywords"], top_matches["Behaviors"], \
-        top_companies, targeted, targeted/total*100
+    Inputs:
+        file_name: name of the ad-impressions.js file, or an archive's data
+            directory to read every ad_impressions part in it. The file is
+            read as-is, it no longer has to be stripped with change_first_line.
+        cache: an optional result_cache.ResultCache. On a hit the parsed
+            statistics are read from the cache instead of the archive.
+        profiler: an optional instrument.Profiler to time each stage
 
+    Outputs:
+        None, just prints summary info. The summary is returned as a tuple,
+            see format_output_report for the same info as fields.
+    '''
 
+    return format_output_report(file_name, cache, profiler).as_tuple()
@@ -1,33 +1,40 @@
-import json
-import queue
+import instrument
+import result_cache
+import spotify_index
+import spotify_table
+import topk
 
-def parse_stream(file_name = "StreamingHistory.json"):
+def parse_stream(file_name = "StreamingHistory.json", cache = None, profiler = None):
 	'''
 	Takes a streaming history file and returns a dictionary of artists, songs, 
 		and runtime
 
 	Inputs:
-		file_name: Should be "StreamingHistory.json"
+		file_name: Should be "StreamingHistory.json", or a Spotify export
+			directory to read its extended history parts, or its
+			StreamingHistory0..N.json if it has none, see
+			spotify_table.find_history_files
+		cache: an optional result_cache.ResultCache. On a hit the history is
+			read from the cache instead of the streaming history file.
+		profiler: an optional instrument.Profiler to time each stage
 
 	Outputs:
 		history, a dictionary of artists keys. Artists keys link to dictionaries of
 			songs, which link to minutes of total streaming time for that song.
 	'''
 
-	history = dict()
-	with open(file_name, "r") as f:
-		stream = json.loads(f.read())
-
-	for song in stream:
-		if song["artistName"] not in history.keys():
-			history[song["artistName"]] = dict()
-			history[song["artistName"]] = dict()
-			history[song["artistName"]][song["trackName"]] = song["msPlayed"] / 60000
-		else:
-			if song["trackName"] in history[song["artistName"]].keys():
-				history[song["artistName"]][song["trackName"]] += song["msPlayed"] / 60000
-			else:
-				history[song["artistName"]][song["trackName"]] = song["msPlayed"] / 60000
+	return result_cache.cached(cache, "parse_spotify.parse_stream/v1", file_name,
+		lambda: _parse_stream(file_name, profiler))
+
+
+def _parse_stream(file_name, profiler):
+	with instrument.stage(profiler, "parse_spotify.parse_stream/load") as stage:
+		table = spotify_table.StreamTable.load(file_name)
+		stage.records = len(table)
+
+	with instrument.stage(profiler, "parse_spotify.parse_stream/aggregate") as stage:
+		history = table.to_history()
+		stage.records = len(table)
 
 	return history
 
@@ -37,7 +44,8 @@ def find_amount_listened(history, artistName):
 	Finds the total amount of time listened to a given artist
 
 	Inputs:
-		history: a dictionary of artists, the return of parse_stream
+		history: a dictionary of artists, the return of parse_stream, or a
+			spotify_index.ArtistIndex built from it
 		artistName: a string, the name of an artist of interest
 
 	Outputs:
@@ -45,12 +53,10 @@ def find_amount_listened(history, artistName):
 			two decimal places)
 	'''
 
-	total_time_listened = 0
-
-	for key, val in history[artistName].items():
-		total_time_listened += val
+	if isinstance(history, spotify_index.ArtistIndex):
+		return history.total_listened(artistName)
 
-	return float("{:.2f}".format(total_time_listened / 60))
+	return round(sum(history[artistName].values()) / 60, 2)
 
 
 def artist_top_songs(history, artistName, maxsize = 10):
@@ -58,7 +64,8 @@ def artist_top_songs(history, artistName, maxsize = 10):
 	Finds the top songs listened to for a given artist
 
 	Inputs:
-		history: a dictionary of artists, the return of parse_stream
+		history: a dictionary of artists, the return of parse_stream, or a
+			spotify_index.ArtistIndex built from it
 		artistName: a string, the name of an artist of interest
 		maxsize: an integer, the maximum number of songs to track, 10 by default
 
@@ -68,24 +75,10 @@ def artist_top_songs(history, artistName, maxsize = 10):
 		tuple is the song name 
 	'''
 
-	top = queue.PriorityQueue(maxsize = maxsize)
-	final = []
+	if isinstance(history, spotify_index.ArtistIndex):
+		return history.top_songs(artistName, maxsize)
 
-	for key, val in history[artistName].items():
-		if not top.full():
-			top.put((val, key))
-		else:
-			bottom = top.get()
-			if val > bottom[0]:
-				top.put((val, key))
-			else:
-				top.put(bottom)
-
-	while not top.empty():
-		final.append(top.get())
-
-	final.reverse()
-	return final
+	return topk.top_k(history[artistName], maxsize)
 
 
 def top_artists(history, maxsize = 10):
@@ -93,7 +86,8 @@ def top_artists(history, maxsize = 10):
 	Finds the top artists listened to
 
 	Inputs:
-		history: a dictionary of artists, the return of parse_stream
+		history: a dictionary of artists, the return of parse_stream, or a
+			spotify_index.ArtistIndex built from it
 		maxsize: an integer, the maximum number of artists to track. 10 by default.
 
 	Outputs:
@@ -102,24 +96,36 @@ def top_artists(history, maxsize = 10):
 			artist name
 	'''
 
-	top = queue.PriorityQueue(maxsize = maxsize)
-	final = []
+	if isinstance(history, spotify_index.ArtistIndex):
+		return history.top_artists(maxsize)
+
+	totals = ((artistName, find_amount_listened(history, artistName))
+		for artistName in history)
 
-	for artistName in history.keys():
-		time_listed = find_amount_listened(history, artistName)
-		if not top.full():
-			top.put((time_listed, artistName))
-		else:
-			bottom = top.get()
-			if time_listed > bottom[0]:
-				top.put((time_listed, artistName))
-			else:
-				top.put(bottom)
+	return topk.top_k(totals, maxsize)
 
-	while not top.empty():
-		final.append(top.get())
 
-	final.reverse()
-	return final
+def approx_top_tracks(file_name, maxsize = 10, capacity = 1000):
+	'''
+	Approximately finds the top tracks listened to, streaming the play rows in
+		bounded memory instead of loading the whole history. A Space-Saving
+		sketch keeps at most capacity tracks, see topk.SpaceSaving.
+
+	Inputs:
+		file_name: a streaming history file or a Spotify export directory, as
+			for parse_stream
+		maxsize: an integer, the maximum number of tracks to return. 10 by default.
+		capacity: an integer, the number of tracks tracked. Should be comfortably
+			larger than maxsize.
+
+	Outputs:
+		final: a list of tuples. The first element of the tuple is an upper
+			bound on the minutes spent listening to the track, the second
+			element is an (artist, track) tuple
+	'''
+
+	sketch = topk.SpaceSaving(capacity)
+	for artist, track, ms, _ in spotify_table.iter_plays(file_name):
+		sketch.add((artist, track), ms)
 
-	
+	return [(ms / 60000, track) for ms, track in sketch.top(maxsize)]
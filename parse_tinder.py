@@ -1,48 +1,104 @@
 import json
 import datetime
-import re
+import instrument
+import reports
+import result_cache
+import tinder_usage
 
 
-def count_matches(filename):
+def parse_usage(filename, cache = None, profiler = None):
 	'''
-	Returns information regarding the number of user's lifetime matches
+	Parses every Usage series of a tinder json file into aligned daily arrays
 
 	Input:
 		filename: a string, the name of the tinder json file
+		cache: an optional result_cache.ResultCache. On a hit the usage is
+			read from the cache instead of the tinder file.
+		profiler: an optional instrument.Profiler to time each stage
 
 	Output:
-		a string, contains information about lifetime reviews.
+		a tinder_usage.Usage
+	'''
+
+	return result_cache.cached(cache, "parse_tinder.parse_usage/v1", filename,
+		lambda: _parse_usage(filename, profiler))
+
+
+def _parse_usage(filename, profiler):
+	with instrument.stage(profiler, "parse_tinder.count_matches/load") as stage:
+		with open(filename, "r") as f:
+			tinder = json.loads(f.read())
+		stage.records = sum(len(series) for series in tinder["Usage"].values())
+
+	with instrument.stage(profiler, "parse_tinder.count_matches/aggregate") as stage:
+		usage = tinder_usage.Usage(tinder["Usage"])
+		stage.records = len(usage)
+
+	return usage
+
+
+def usage_totals(usage):
+	'''
+	The lifetime totals count_matches reports
+
+	Input:
+		usage: a tinder_usage.Usage
+
+	Output:
+		a tuple (earliest, latest, matches, likes, passes), where earliest and
+			latest are datetime.date objects bounding the matches series
+	'''
+
+	totals = usage.totals()
+	bounds = usage.bounds["matches"]
+	if bounds is None:
+		earliest, latest = datetime.date(2050, 12, 31), datetime.date(2010, 1, 1)
+	else:
+		earliest, latest = (day.item() for day in bounds)
+
+	return earliest, latest, totals["matches"], totals["swipes_likes"], \
+		totals["swipes_passes"]
+
+
+def count_matches_report(filename, cache = None, profiler = None):
 	'''
+	Collects the user's lifetime matches, likes and passes
 
-	with open(filename, "r") as f:
-		tinder = json.loads(f.read())
-		matches = 0
-		likes = 0
-		passes = 0
-		earliest = datetime.date(2050, 12, 31)
-		latest = datetime.date(2010, 1, 1)
-		DATE = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
+	Input:
+		filename: a string, the name of the tinder json file
+		cache: an optional result_cache.ResultCache. On a hit the usage is
+			read from the cache instead of the tinder file.
+		profiler: an optional instrument.Profiler to time each stage
 
-		for i, val in tinder["Usage"]["matches"].items():
-			matches += val
-			day = DATE.findall(i)
-			day = [int(i) for i in day[0]]
-			day = datetime.date(day[0], day[1], day[2])
-			if day < earliest:
-				earliest = day
-			if day > latest:
-				latest = day
+	Output:
+		a reports.TinderMatchesReport
+	'''
 
-		for i, val in tinder["Usage"]["swipes_likes"].items():
-			likes += val
+	earliest, latest, matches, likes, passes = usage_totals(
+		parse_usage(filename, cache, profiler))
 
-		for i, val in tinder["Usage"]["swipes_passes"].items():
-			passes += val
+	return reports.TinderMatchesReport(earliest, latest, matches, likes, passes,
+		matches / likes if likes else None, passes / likes if likes else None)
 
-	return "Between {} and {}, you received {} matches on {} likes and {} passes, which is a match rate of {:.2f}%, and a swipe ratio of {:.2f}".\
-		format(earliest, latest, matches, likes, passes, matches/likes*100, passes/likes)
 
+def count_matches(filename, cache = None, profiler = None):
+	'''
+	Returns information regarding the number of user's lifetime matches
 
+	Input:
+		filename: a string, the name of the tinder json file
+		cache: an optional result_cache.ResultCache. On a hit the usage is
+			read from the cache instead of the tinder file.
+		profiler: an optional instrument.Profiler to time each stage
+
+	Output:
+		a string, contains information about lifetime reviews, see
+			count_matches_report for the same info as fields
+	'''
 
+	report = count_matches_report(filename, cache, profiler)
 
+	with instrument.stage(profiler, "parse_tinder.count_matches/format"):
+		summary = report.text
 
+	return summary
@@ -1,20 +1,44 @@
 import json
 import datetime
+import instrument
 import re
 import random
+import reports
+import result_cache
+import tumblr_ads
+import tumblr_dates
+import tumblr_lazy
 
 
-def load_file(file_name):
+DATE = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
+
+
+def load_file(file_name, cache = None, lazy = False):
 	'''
 	Loads your tumblr file
 
 	Input:
 		file_name: a .json file with your tumblr data
+		cache: an optional result_cache.ResultCache. On a hit the data is
+			read from the cache instead of the json file, or with lazy, the
+			section offsets are read from the cache instead of rescanned.
+		lazy: if True, returns a tumblr_lazy.LazyExport that only parses a
+			section when it is first accessed
 
 	Output:
 		tumblr: a json loaded file from the load_file function
 	'''
 
+	if lazy:
+		offsets = result_cache.cached(cache, "parse_tumblr.section_offsets/v1",
+			file_name, lambda: tumblr_lazy.scan_sections(file_name))
+		return tumblr_lazy.LazyExport(file_name, offsets)
+
+	return result_cache.cached(cache, "parse_tumblr.load_file/v1", file_name,
+		lambda: _load_file(file_name))
+
+
+def _load_file(file_name):
 	with open(file_name, "r") as f:
 		tumblr = json.loads(f.read())
 		tumblr = tumblr[0]["data"]
@@ -32,8 +56,7 @@ def parse_date(date_str):
 	Output:
 		day: a datetime object
 	'''
-	DATE = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
-	
+
 	day = DATE.findall(date_str)
 	day = [int(i) for i in day[0]]
 	day = datetime.date(day[0], day[1], day[2])
@@ -41,6 +64,20 @@ def parse_date(date_str):
 	return day
 
 
+def crushes_report(tumblr):
+	'''
+	Find out who tumblr thinks you're crushing on
+
+	Input:
+		tumblr: a json loaded file from the load_file function
+
+	Output:
+		a reports.TumblrCrushesReport
+	'''
+
+	return reports.TumblrCrushesReport([crush["blog_name"] for crush in tumblr["crushes"]])
+
+
 def extract_crushes_str(tumblr):
 	'''
 	Find out who tumblr thinks you're crushing on and who's crushing on you
@@ -52,15 +89,26 @@ def extract_crushes_str(tumblr):
 		crushes_str: a str with relevant info about tumblr crushes
 	'''
 
-	crushes = tumblr["crushes"]
-	crushes_str = "Tumblr thinks your top {} crushes are on the following users:"\
-		.format(len(crushes))
+	return crushes_report(tumblr).text
+
+
+def crushers_report(tumblr):
+	'''
+	Find out who tumblr thinks is crushing on you
+
+	Input:
+		tumblr: a json loaded file from the load_file function
 
-	for crush in crushes[:-1]:
-		crushes_str += " {},".format(crush["blog_name"])
-	crushes_str += " and {}. ".format(crushes[-1]["blog_name"])
+	Output:
+		a reports.TumblrCrushersReport
+	'''
 
-	return crushes_str
+	crushers = dict()
+	for blog in tumblr["crushers"]:
+		blog_name = list(blog.keys())[0]
+		crushers[blog_name] = [crusher["blog_name"] for crusher in blog[blog_name]]
+
+	return reports.TumblrCrushersReport(crushers)
 
 
 def extract_crushers_str(tumblr):
@@ -74,19 +122,13 @@ def extract_crushers_str(tumblr):
 		crushers_str: a str with relevant info about tumblr crushes
 	'''
 
-	crushers = tumblr["crushers"]
-	crushers_str = ""
+	return crushers_report(tumblr).text
 
-	for blog in crushers:
-		blog_name = list(blog.keys())[0]
-		if len(blog[blog_name]) > 0:
-			crushers_str += "For your blog named {}, Tumblr thinks the following users are crushing on you:"\
-			.format(blog_name)
-			for crusher in blog[blog_name][:-1]:
-				crushers_str += " {},".format(crusher["blog_name"])
-			crushers_str += " and {}. ".format(blog[blog_name][-1]["blog_name"])
 
-	return crushers_str
+def _dashboard_info(tumblr):
+	dash = tumblr_dates.DateColumn.from_section(tumblr, "dashboard")
+
+	return len(dash), dash.min(), dash.max()
 
 
 def parse_dashboard(tumblr):
@@ -101,24 +143,15 @@ def parse_dashboard(tumblr):
 		dash_str: a str with relevant info about your tumblr file
 	'''
 
-	dash = tumblr["dashboard"]
-	dash_str = "Tumblr has kept track of the last {} posts you've seen. "\
-		.format(len(dash))
-
-	earliest = parse_date(dash[0]["serve_time"])
-	latest = earliest
+	return reports.format_dashboard(*_dashboard_info(tumblr))
 
-	for post in dash:
-		day = parse_date(post["serve_time"])
 
-		if day < earliest:
-			earliest = day
-		if day > latest:
-			latest = day
-
-	dash_str += "These posts range from {} to {}. ".format(earliest, latest)
+def _easter_egg_info(tumblr):
+	for blog in tumblr["blog_names"]:
+		if len(blog["prev_used_blog_name"]) > 0:
+			return blog["current_blog_name"], random.choice(blog["prev_used_blog_name"])
 
-	return dash_str
+	return None
 
 
 def easter_egg_blog(tumblr):
@@ -132,19 +165,7 @@ def easter_egg_blog(tumblr):
 		easter_egg: str with prev blog name, if applicable
 	'''
 
-	easter = tumblr["blog_names"]
-	easter_egg = ""
-
-	for blog in easter:
-		if len(blog["prev_used_blog_name"]) > 0:
-			cur_name = blog["current_blog_name"]
-			old_name = random.choice(blog["prev_used_blog_name"])
-
-			easter_egg += "By the way, remember when your blog called {} was called {}? "\
-			.format(cur_name, old_name)
-			break
-
-	return easter_egg
+	return reports.format_easter_egg(_easter_egg_info(tumblr))
 
 
 def ads_summary(tumblr):
@@ -155,39 +176,25 @@ def ads_summary(tumblr):
 		tumblr: a json loaded file from the load_file function
 
 	Output:
-		ads_str: a str with information about ads tumblr keeps on you
+		ads_str: a str with information about ads tumblr keeps on you, see
+			tumblr_ads.AdAnalytics for the counts as numbers
 	'''
 
-	ads = tumblr["ads_analytics"]
-	gem_ads = tumblr["gemini_analytics"]
-	cli_ads = tumblr["client_side_ad_analytics"]
-
-	earliest = parse_date(ads[0]["serve_time"])
-	num_seen = 0
-	interacted = 0
-	all_served = len(ads) + len(gem_ads) + len(cli_ads)
-	
-
-	for ad_class in [ads, gem_ads, cli_ads]:
-		for ad in ad_class:
-			if ad["serve_time"] != "\\N":
-				day = parse_date(ad["serve_time"])
-				if day < earliest:
-					earliest = day
-			if ad["viewed"] == "true":
-				num_seen += 1
-			if ad["interacted"] == "true":
-				interacted += 1
-
-	ads_str = "Since {}, Tumblr has kept track of the ads they've served you. "\
-	.format(earliest)
-	ads_str += "This doesn't just include the {} ads you actually saw, but also"\
-	.format(num_seen)
-	ads_str += " another {} that you never viewed. ".format(all_served-num_seen)
-	ads_str += "Of those, you interacted with {} of them, or about {:.2f}%. "\
-	.format(interacted, interacted/num_seen*100)
-
-	return ads_str
+	ads = tumblr_ads.AdAnalytics(tumblr)
+
+	return reports.format_ads(ads.earliest(), ads.summary())
+
+
+def _top_tag_info(tumblr):
+	top_count = 0
+
+	for tag in tumblr["most_used_tags"]:
+		if int(tag["tag_count"]) > top_count:
+			top_count = int(tag["tag_count"])
+			top_blog = tag["blog_name"]
+			top_tag = tag["tag"]
+
+	return top_tag, top_blog, top_count
 
 
 def top_tags(tumblr):
@@ -201,19 +208,13 @@ def top_tags(tumblr):
 		tag_str: a str with info about your top tag
 	'''
 
-	tags = tumblr["most_used_tags"]
-	top_count = 0
+	return reports.format_top_tag(*_top_tag_info(tumblr))
 
-	for tag in tags:
-		if int(tag["tag_count"]) > top_count:
-			top_count = int(tag["tag_count"])
-			top_blog = tag["blog_name"]
-			top_tag = tag["tag"]
 
-	tag_str = "You use the tag '{}' on your {} blog a lot; {} to be exact."\
-	.format(top_tag, top_blog, top_count)
+def _last_active_info(tumblr):
+	sessions = tumblr_dates.DateColumn.from_section(tumblr, "last_active_times")
 
-	return tag_str
+	return sessions.min(), len(sessions)
 
 
 def last_active(tumblr):
@@ -227,19 +228,14 @@ def last_active(tumblr):
 		act_str: a str with info about your last active session
 	'''
 
-	sessions = tumblr["last_active_times"]
-	earliest = parse_date(sessions[0])
-	act_str = "Tumblr has also stored every time you were active on their site"
+	return reports.format_last_active(*_last_active_info(tumblr))
 
-	for session in sessions:
-		day = parse_date(session)
-		if day < earliest:
-			earliest = day
 
-	act_str += " since {}, or {} active sessions."\
-	.format(earliest, len(sessions))
+def _interests_info(tumblr):
+	interests = tumblr["user_interest_profiles"]
+	sample = random.sample(interests, min(5, len(interests)))
 
-	return act_str
+	return len(interests), [interest["interest"] for interest in sample]
 
 
 def interests(tumblr):
@@ -253,56 +249,86 @@ def interests(tumblr):
 		int_str: a str with summary info about inferred interests
 	'''
 
-	interests = tumblr["user_interest_profiles"]
-	int_str = "Tumblr has also used your behavior on their site to infer interests about you. "
-	int_str += "From these behaviors, they have inferred {} interests about you. "\
-	.format(len(interests))
-	int_str += "Here is a sample of those inferred interests: "
+	return reports.format_interests(*_interests_info(tumblr))
 
-	int_sample = random.sample(interests, min(5, len(interests)))
-	for interest in int_sample[:-1]:
-		int_str += "{}, ".format(interest["interest"])
-	int_str += "and {}.".format(int_sample[-1]["interest"])
 
-	return int_str
+def summary_report(file_name, cache = None, profiler = None):
+	'''
+	Collects relevant summary info from your tumblr data.
+
+	Input:
+		file_name: a .json file with your tumblr data
+		cache: an optional result_cache.ResultCache, see load_file
+		profiler: an optional instrument.Profiler to time each stage
 
+	Output:
+		a reports.TumblrSummaryReport
+	'''
 
-def summary_info(file_name):
+	with instrument.stage(profiler, "parse_tumblr.summary_info/load"):
+		tumblr = load_file(file_name, cache)
+
+	with instrument.stage(profiler, "parse_tumblr.summary_info/last_active") as stage:
+		active_since, active_sessions = _last_active_info(tumblr)
+		stage.records = active_sessions
+
+	with instrument.stage(profiler, "parse_tumblr.summary_info/dashboard") as stage:
+		dash_posts, dash_first, dash_last = _dashboard_info(tumblr)
+		stage.records = dash_posts
+
+	with instrument.stage(profiler, "parse_tumblr.summary_info/ads") as stage:
+		ads = tumblr_ads.AdAnalytics(tumblr)
+		stage.records = len(ads)
+
+	with instrument.stage(profiler, "parse_tumblr.summary_info/interests") as stage:
+		num_interests, interest_sample = _interests_info(tumblr)
+		stage.records = num_interests
+
+	with instrument.stage(profiler, "parse_tumblr.summary_info/blogs"):
+		blog_names = _easter_egg_info(tumblr)
+		crushes = crushes_report(tumblr)
+		crushers = crushers_report(tumblr)
+
+	with instrument.stage(profiler, "parse_tumblr.summary_info/tags") as stage:
+		top_tag = _top_tag_info(tumblr)
+		stage.records = len(tumblr["most_used_tags"])
+
+	return reports.TumblrSummaryReport(
+		joined = tumblr["registration_time"].split(" ")[0],
+		last_post = tumblr["last_post_time"].split("T")[0],
+		unfollows = len(tumblr["unfollows"]),
+		active_since = active_since,
+		active_sessions = active_sessions,
+		dashboard_posts = dash_posts,
+		dashboard_first = dash_first,
+		dashboard_last = dash_last,
+		ads_since = ads.earliest(),
+		ads = ads.summary(),
+		interests = num_interests,
+		interest_sample = interest_sample,
+		blog_names = blog_names,
+		crushes = crushes,
+		crushers = crushers,
+		top_tag = top_tag)
+
+
+def summary_info(file_name, cache = None, profiler = None):
 	'''
 	Returns relevant summary info from your tumblr data.
 
 	Input:
 		file_name: a .json file with your tumblr data
+		cache: an optional result_cache.ResultCache, see load_file
+		profiler: an optional instrument.Profiler to time each stage
 
 	Output:
-		summary_str: a str with relevant info about your tumblr data
+		summary_str: a str with relevant info about your tumblr data, see
+			summary_report for the same info as fields
 	'''
 
-	tumblr = load_file(file_name)
-	join_time = tumblr["registration_time"].split(" ")[0]
-	last_post = tumblr["last_post_time"].split("T")[0]
-	unfollows = tumblr["unfollows"]
+	report = summary_report(file_name, cache, profiler)
 
-	summary_str = "According to your data, you joined Tumblr on {}"\
-		.format(join_time)
-	summary_str += ", and you last posted on {}. ".format(last_post)
-	summary_str += "Over the course of this time, you have unfollowed {} users. "\
-	.format(len(unfollows))
-	summary_str += last_active(tumblr) + "\n \n"
-
-	summary_str += parse_dashboard(tumblr)
-	summary_str += ads_summary(tumblr) 
-	summary_str += interests(tumblr) + "\n \n"
-
-	summary_str += easter_egg_blog(tumblr)
-	summary_str += extract_crushes_str(tumblr)
-	summary_str += extract_crushers_str(tumblr)
-	summary_str += top_tags(tumblr)
+	with instrument.stage(profiler, "parse_tumblr.summary_info/build"):
+		summary_str = report.text
 
 	return summary_str
-
-
-
-
-
-
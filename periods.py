@@ -0,0 +1,103 @@
+import numpy as np
+
+
+FREQS = ("day", "week", "month")
+
+
+def weekday(days):
+    '''
+    Day of the week of every day.
+
+    Inputs:
+        days: a datetime64[D] array
+
+    Outputs:
+        an int64 array with Monday as 0 and Sunday as 6
+    '''
+
+    # day 0 of the epoch was a Thursday
+    return (days.view(np.int64) + 3) % 7
+
+
+def week_start(days):
+    '''
+    Truncates every day to the Monday starting its week.
+
+    Inputs:
+        days: a datetime64[D] array
+
+    Outputs:
+        a datetime64[D] array aligned with days
+    '''
+
+    return days - weekday(days)
+
+
+def truncate(days, freq, freqs = FREQS):
+    '''
+    Truncates every day to the start of its period.
+
+    Inputs:
+        days: a datetime64[D] array
+        freq: "day", "week" or "month". Weeks start on Monday.
+        freqs: the periods the caller accepts, any other freq raises a
+            ValueError listing them
+
+    Outputs:
+        a datetime64 array aligned with days, datetime64[M] for months
+    '''
+
+    if freq not in freqs or freq not in FREQS:
+        raise ValueError("freq must be one of {}".format(", ".join(freqs)))
+
+    if freq == "week":
+        return week_start(days)
+    if freq == "month":
+        return days.astype("datetime64[M]")
+
+    return days
+
+
+def bin_index(periods, step = 1):
+    '''
+    Numbers periods by their distance from the first one, so that every
+    period between the first and the last gets a bin, empty or not.
+
+    Inputs:
+        periods: a datetime64 array of period starts, e.g. from truncate
+        step: an integer, the length of a period in units of periods' dtype,
+            e.g. 7 for weeks of datetime64[D]
+
+    Outputs:
+        a tuple (bins, index): a datetime64 array with the start of every bin
+            and an int64 array with the bin of each period
+    '''
+
+    if len(periods) == 0:
+        return periods[:0], np.zeros(0, dtype = np.int64)
+
+    start = periods.min()
+    index = (periods - start).view(np.int64) // step
+
+    return start + np.arange(int(index.max()) + 1) * step, index
+
+
+def series(periods, step = 1, weights = None):
+    '''
+    Counts periods, or sums their weights, into one bin per period from the
+    first to the last. Periods without entries are included with 0.
+
+    Inputs:
+        periods: a datetime64 array of period starts, see bin_index
+        step: an integer, the length of a period in units of periods' dtype
+        weights: an optional array aligned with periods to sum instead of
+            counting
+
+    Outputs:
+        a tuple (bins, totals): a datetime64 array with the start of every
+            bin, and an int64 array of counts or a float64 array of sums
+    '''
+
+    bins, index = bin_index(periods, step)
+
+    return bins, np.bincount(index, weights = weights, minlength = len(bins))
@@ -0,0 +1,320 @@
+import abc
+import dataclasses
+import datetime
+import json
+
+
+class Report(abc.ABC):
+    '''
+    Base class of the structured results returned by the *_report functions.
+    Subclasses are frozen slots dataclasses with a non-init _rendered field;
+    their text and JSON renderings are built on first use and cached there,
+    so callers can take the fields they need or any rendering without
+    recomputing the report. Only immutable strings are cached, so nothing a
+    caller gets back can change a later rendering.
+    '''
+
+    __slots__ = ()
+
+
+    def _render(self, kind, render):
+        if kind not in self._rendered:
+            self._rendered[kind] = render()
+
+        return self._rendered[kind]
+
+
+    @abc.abstractmethod
+    def render_text(self):
+        '''
+        Builds the prose rendering, see text.
+        '''
+
+
+    @property
+    def text(self):
+        '''
+        The report as prose, the way the original string functions returned
+        it.
+        '''
+
+        return self._render("text", self.render_text)
+
+
+    def to_dict(self):
+        '''
+        The report's fields as a new dictionary, with nested reports converted
+        to dictionaries too. Containers are copied, so the dictionary can be
+        changed freely.
+        '''
+
+        return {field.name: _plain(getattr(self, field.name))
+                for field in dataclasses.fields(self) if field.init}
+
+
+    def to_json(self):
+        '''
+        The report as a JSON string. Dates are written in ISO format.
+        '''
+
+        return self._render("json", lambda: json.dumps(self.to_dict(),
+                                                        default = _json_default))
+
+
+def _plain(value):
+    if isinstance(value, Report):
+        return value.to_dict()
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _plain(item) for key, item in value.items()}
+
+    return value
+
+
+def _json_default(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+
+    raise TypeError("{!r} is not JSON serializable".format(value))
+
+
+def _cache():
+    return dataclasses.field(default_factory = dict, init = False,
+                             repr = False, compare = False)
+
+
+def _names(names):
+    '''
+    " a, b, and c. "-style list used throughout the Tumblr summary.
+    '''
+
+    text = "".join(" {},".format(name) for name in names[:-1])
+
+    return text + " and {}. ".format(names[-1])
+
+
+def _long_date(day):
+    return "{} {}, {}".format(day.strftime("%B"), day.day, day.year)
+
+
+@dataclasses.dataclass(frozen = True, slots = True)
+class TwitterAdsReport(Report):
+    '''
+    Summary of a Twitter ad-impressions archive, see
+    parse_json.format_output_report.
+    '''
+
+    first: datetime.date
+    last: datetime.date
+    targeted: int
+    total: int
+    avg_targets: float
+    interests: dict
+    follower_lookalikes: dict
+    events: dict
+    keywords: dict
+    behaviors: dict
+    top_companies: dict
+    tailored: int
+    tailored_percent: float
+    _rendered: dict = _cache()
+
+
+    def as_tuple(self):
+        '''
+        The 13-tuple parse_json.format_output returns.
+        '''
+
+        return _long_date(self.first), _long_date(self.last), self.targeted, \
+            self.total, self.avg_targets, self.interests, \
+            self.follower_lookalikes, self.events, self.keywords, \
+            self.behaviors, self.top_companies, self.tailored, \
+            self.tailored_percent
+
+
+    def render_text(self):
+        text = ("From {} to {}, there were {} targeted ads in your data ({} total)."
+            " On average, each ad had {:.2f} targeting criteria."
+            " Of those, advertisers wanted to reach you the most in the following "
+            "categories: \n \n").format(_long_date(self.first),
+            _long_date(self.last), self.targeted, self.total, self.avg_targets)
+        text += ("Interests: {} \n \nFollower look-alikes: {} \n \nEvents: {} \n \n"
+            "Keywords: {} \n \nBehaviors: {} \n \n").format(self.interests,
+            self.follower_lookalikes, self.events, self.keywords, self.behaviors)
+        text += "The top 10 companies advertising to you were {}".format(
+            self.top_companies)
+        text += ("\n \nThere were approximately {} ads targeted to you from tailored"
+            " audience lists, making up {:.2f}% of all ads you saw").format(
+            self.tailored, self.tailored_percent)
+
+        return text
+
+
+@dataclasses.dataclass(frozen = True, slots = True)
+class TinderMatchesReport(Report):
+    '''
+    Lifetime Tinder match totals, see parse_tinder.count_matches_report.
+    Rates are None when there were no likes.
+    '''
+
+    earliest: datetime.date
+    latest: datetime.date
+    matches: int
+    likes: int
+    passes: int
+    match_rate: float
+    swipe_ratio: float
+    _rendered: dict = _cache()
+
+
+    def render_text(self):
+        text = "Between {} and {}, you received {} matches on {} likes and {} passes"\
+            .format(self.earliest, self.latest, self.matches, self.likes, self.passes)
+        if self.likes == 0:
+            return text
+
+        return text + ", which is a match rate of {:.2f}%, and a swipe ratio of {:.2f}"\
+            .format(self.match_rate * 100, self.swipe_ratio)
+
+
+@dataclasses.dataclass(frozen = True, slots = True)
+class TumblrCrushesReport(Report):
+    '''
+    The users Tumblr thinks you're crushing on, see
+    parse_tumblr.crushes_report.
+    '''
+
+    crushes: list
+    _rendered: dict = _cache()
+
+
+    def render_text(self):
+        if not self.crushes:
+            return ""
+
+        return "Tumblr thinks your top {} crushes are on the following users:"\
+            .format(len(self.crushes)) + _names(self.crushes)
+
+
+@dataclasses.dataclass(frozen = True, slots = True)
+class TumblrCrushersReport(Report):
+    '''
+    The users Tumblr thinks are crushing on each of your blogs, see
+    parse_tumblr.crushers_report.
+    '''
+
+    crushers: dict
+    _rendered: dict = _cache()
+
+
+    def render_text(self):
+        text = ""
+        for blog_name, crushers in self.crushers.items():
+            if crushers:
+                text += "For your blog named {}, Tumblr thinks the following users are crushing on you:"\
+                    .format(blog_name) + _names(crushers)
+
+        return text
+
+
+def format_last_active(since, sessions):
+    return "Tumblr has also stored every time you were active on their site" + \
+        " since {}, or {} active sessions.".format(since, sessions)
+
+
+def format_dashboard(posts, first, last):
+    return "Tumblr has kept track of the last {} posts you've seen. ".format(posts) + \
+        "These posts range from {} to {}. ".format(first, last)
+
+
+def format_ads(since, ads):
+    '''
+    Inputs:
+        since: the first day an ad was served
+        ads: a tumblr_ads.AdAnalytics.summary dictionary
+    '''
+
+    text = "Since {}, Tumblr has kept track of the ads they've served you. ".format(since)
+    text += "This doesn't just include the {} ads you actually saw, but also"\
+        .format(ads["viewed"])
+    text += " another {} that you never viewed. ".format(ads["unseen"])
+    if ads["viewed"]:
+        text += "Of those, you interacted with {} of them, or about {:.2f}%. "\
+            .format(ads["interacted"], ads["interaction"] * 100)
+    else:
+        text += "Of those, you interacted with {} of them. ".format(ads["interacted"])
+
+    return text
+
+
+def format_interests(count, sample):
+    text = "Tumblr has also used your behavior on their site to infer interests about you. "
+    text += "From these behaviors, they have inferred {} interests about you. ".format(count)
+    text += "Here is a sample of those inferred interests: "
+    text += "".join("{}, ".format(interest) for interest in sample[:-1])
+
+    return text + "and {}.".format(sample[-1])
+
+
+def format_easter_egg(blog_names):
+    '''
+    Inputs:
+        blog_names: a (current name, previous name) tuple, or None
+    '''
+
+    if blog_names is None:
+        return ""
+
+    return "By the way, remember when your blog called {} was called {}? "\
+        .format(*blog_names)
+
+
+def format_top_tag(tag, blog_name, count):
+    return "You use the tag '{}' on your {} blog a lot; {} to be exact."\
+        .format(tag, blog_name, count)
+
+
+@dataclasses.dataclass(frozen = True, slots = True)
+class TumblrSummaryReport(Report):
+    '''
+    Summary of a Tumblr export, see parse_tumblr.summary_report.
+    '''
+
+    joined: str
+    last_post: str
+    unfollows: int
+    active_since: datetime.date
+    active_sessions: int
+    dashboard_posts: int
+    dashboard_first: datetime.date
+    dashboard_last: datetime.date
+    ads_since: datetime.date
+    ads: dict
+    interests: int
+    interest_sample: list
+    blog_names: tuple
+    crushes: TumblrCrushesReport
+    crushers: TumblrCrushersReport
+    top_tag: tuple
+    _rendered: dict = _cache()
+
+
+    def render_text(self):
+        text = "According to your data, you joined Tumblr on {}".format(self.joined)
+        text += ", and you last posted on {}. ".format(self.last_post)
+        text += "Over the course of this time, you have unfollowed {} users. "\
+            .format(self.unfollows)
+        text += format_last_active(self.active_since, self.active_sessions) + "\n \n"
+
+        text += format_dashboard(self.dashboard_posts, self.dashboard_first,
+                                 self.dashboard_last)
+        text += format_ads(self.ads_since, self.ads)
+        text += format_interests(self.interests, self.interest_sample) + "\n \n"
+
+        text += format_easter_egg(self.blog_names)
+        text += self.crushes.text
+        text += self.crushers.text
+        text += format_top_tag(*self.top_tag)
+
+        return text
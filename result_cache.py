@@ -0,0 +1,238 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+
+
+CHUNK_SIZE = 1 << 20
+
+
+def content_hash(path):
+    '''
+    Hashes the contents of a file, or of every file directly inside a
+    directory.
+
+    Inputs:
+        path: a file or directory name
+
+    Outputs:
+        a hex digest string
+    '''
+
+    digest = hashlib.blake2b(digest_size = 20)
+
+    if os.path.isdir(path):
+        names = sorted(e.name for e in os.scandir(path) if e.is_file())
+        files = [os.path.join(path, name) for name in names]
+    else:
+        files = [path]
+
+    for file_name in files:
+        digest.update(os.path.basename(file_name).encode("utf-8"))
+        with open(file_name, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def file_stat(path):
+    '''
+    The (size, mtime) of a file. For a directory, the total size and the
+    latest mtime of the files directly inside it.
+    '''
+
+    if not os.path.isdir(path):
+        st = os.stat(path)
+        return st.st_size, st.st_mtime_ns
+
+    size = 0
+    mtime = os.stat(path).st_mtime_ns
+    for entry in os.scandir(path):
+        if entry.is_file():
+            st = entry.stat()
+            size += st.st_size
+            mtime = max(mtime, st.st_mtime_ns)
+
+    return size, mtime
+
+
+class ResultCache:
+    '''
+    On-disk cache of parsed results, keyed by an input file's path and
+    content hash. Results are pickled, one file per entry, and the least
+    recently used entries are evicted once the cache grows past max_bytes.
+
+    The entry files are the only record of what is cached: their sizes and
+    mtimes, bumped on every hit, give the total size and LRU order, so
+    several processes can share a cache directory without losing each
+    other's entries, and files no process knows about still count towards
+    max_bytes and get evicted.
+
+    Content hashes are remembered per (path, size, mtime) in index.json, so
+    while those are unchanged a warm hit neither parses nor hashes the
+    input. A touched but unchanged file is rehashed once and still hits.
+    '''
+
+    def __init__(self, directory = ".parse_cache", max_bytes = 256 << 20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._index_file = os.path.join(directory, "index.json")
+        os.makedirs(directory, exist_ok = True)
+        self._hashes = self._read_hashes()
+
+
+    def _read_hashes(self):
+        try:
+            with open(self._index_file, "r") as f:
+                return json.load(f)["hashes"]
+        except (OSError, ValueError, KeyError):
+            return dict()
+
+
+    def _remember_hash(self, path, stat_key, digest):
+        # merge into the index on disk, so hashes other processes stored
+        # since it was read aren't overwritten
+        hashes = self._read_hashes()
+        hashes.update(self._hashes)
+        for old in [k for k in hashes if k.split("\0")[0] == path]:
+            del hashes[old]
+        hashes[stat_key] = digest
+        self._hashes = hashes
+        self._write_atomic(self._index_file,
+                           json.dumps({"hashes": hashes}).encode("utf-8"))
+
+
+    def _write_atomic(self, file_name, data):
+        fd, tmp = tempfile.mkstemp(dir = self.directory, suffix = ".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, file_name)
+
+
+    def _entry_files(self):
+        return [entry for entry in os.scandir(self.directory)
+                if entry.name.endswith(".pkl") and entry.is_file()]
+
+
+    def key(self, namespace, path):
+        '''
+        Computes the cache key of a result derived from path.
+
+        Inputs:
+            namespace: a string naming the kind of result and its version,
+                e.g. "parse_json.AdStats/v1". Bump the version whenever the
+                cached object's class changes, so old pickles aren't used.
+            path: the input file or directory name
+
+        Outputs:
+            a hex digest string
+        '''
+
+        path = os.path.abspath(path)
+        size, mtime = file_stat(path)
+        stat_key = "{}\0{}\0{}".format(path, size, mtime)
+
+        if stat_key not in self._hashes:
+            self._remember_hash(path, stat_key, content_hash(path))
+
+        ident = "\0".join([namespace, path, self._hashes[stat_key]])
+        return hashlib.blake2b(ident.encode("utf-8"), digest_size = 20).hexdigest()
+
+
+    def get_or_compute(self, namespace, path, compute):
+        '''
+        Returns the cached result for path, computing and storing it on a
+        miss.
+
+        Inputs:
+            namespace: a string naming the kind of result, see key
+            path: the input file or directory name
+            compute: a function of no arguments returning the result
+
+        Outputs:
+            the result
+        '''
+
+        entry_file = os.path.join(self.directory, self.key(namespace, path) + ".pkl")
+
+        try:
+            with open(entry_file, "rb") as f:
+                result = pickle.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception:
+            # a truncated file, or one pickled by code that has since changed
+            # (AttributeError, ModuleNotFoundError, ...), is just a miss
+            self._remove(entry_file)
+        else:
+            try:
+                os.utime(entry_file)
+            except OSError:
+                pass
+            return result
+
+        result = compute()
+        data = pickle.dumps(result, protocol = pickle.HIGHEST_PROTOCOL)
+        if len(data) <= self.max_bytes:
+            self._write_atomic(entry_file, data)
+            self._evict()
+
+        return result
+
+
+    def _remove(self, file_name):
+        # another process may have evicted it already
+        try:
+            os.remove(file_name)
+        except OSError:
+            pass
+
+
+    def _evict(self):
+        entries = []
+        for entry in self._entry_files():
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime_ns, st.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, file_name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            total -= size
+            self._remove(file_name)
+
+
+    def clear(self):
+        '''
+        Removes every cached result.
+        '''
+
+        for entry in self._entry_files():
+            self._remove(entry.path)
+        self._remove(self._index_file)
+        self._hashes = dict()
+
+
+def cached(cache, namespace, path, compute):
+    '''
+    Runs compute through cache if one is given, otherwise just calls it.
+
+    Inputs:
+        cache: a ResultCache, or None
+        namespace: a string naming the kind of result, see ResultCache.key
+        path: the input file or directory name
+        compute: a function of no arguments returning the result
+
+    Outputs:
+        the result
+    '''
+
+    if cache is None:
+        return compute()
+
+    return cache.get_or_compute(namespace, path, compute)
@@ -2,6 +2,92 @@ import numpy as np
 import random
 import math
 
+
+NUM_CARDS = 81
+# cards are integers 0-80, the base-3 number of their four attributes, so
+# (a, b, c, d) is 27a + 9b + 3c + d and the first attribute is most significant
+ATTRIBUTES = np.array([[card // 27, card // 9 % 3, card // 3 % 3, card % 3]
+	for card in range(NUM_CARDS)])
+PLACES = np.array([27, 9, 3, 1])
+# THIRD[a, b] completes the set of cards a and b: each attribute of a set is
+# all the same or all different, i.e. the three values sum to 0 mod 3
+THIRD = (-(ATTRIBUTES[:, None, :] + ATTRIBUTES[None, :, :]) % 3) @ PLACES
+CARDS = [tuple(attributes) for attributes in ATTRIBUTES.tolist()]
+CARD_INDEX = {card: i for i, card in enumerate(CARDS)}
+_THIRD = THIRD.tolist()
+
+
+def encode(card):
+	'''
+	converts a tuple card to its integer, 0-80
+	'''
+
+	return CARD_INDEX[tuple(card)]
+
+
+def decode(card):
+	'''
+	converts an integer card to its tuple
+	'''
+
+	return CARDS[card]
+
+
+def third_card(card_one, card_two):
+	'''
+	the integer card completing the set of two integer cards
+	'''
+
+	return _THIRD[card_one][card_two]
+
+
+def is_set(card_one, card_two, card_three):
+	'''
+	whether three integer cards are a set
+	'''
+
+	return _THIRD[card_one][card_two] == card_three
+
+
+def table_mask(table):
+	'''
+	an 81-bit integer with bit i set for every integer card i on the table
+	'''
+
+	mask = 0
+	for card in table:
+		mask |= 1 << card
+
+	return mask
+
+
+def find_set_ints(table, mask = None):
+	'''
+	finds a set on a table of integer cards, checking each pair's third
+	card against the table's bit mask: O(n^2) lookups instead of O(n^3)
+
+	inputs:
+		table, a list of integer cards
+		mask, optionally table_mask(table) if the caller keeps it
+
+	outputs:
+		if a set exists, returns the set as a list of 3 integer cards
+		else returns False
+	'''
+
+	if mask is None:
+		mask = table_mask(table)
+
+	for i, card_one in enumerate(table):
+		row = _THIRD[card_one]
+		for card_two in table[i+1:]:
+			card_three = row[card_two]
+			if mask >> card_three & 1:
+				return [card_one, card_two, card_three]
+
+	return False
+
+
 def generate_deck():
 	'''
 	generates a deck of set cards
@@ -10,15 +96,7 @@ def generate_deck():
 	outputs: deck: a list of tuples representing cards
 	'''
 
-	deck = []
-
-	for first_e in range(3):
-		for second_e in range(3):
-			for third_e in range(3):
-				for fourth_e in range(3):
-					deck.append((first_e, second_e, third_e, fourth_e))
-
-	return deck
+	return list(CARDS)
 
 
 def check_set(potential_set):
@@ -29,14 +107,9 @@ def check_set(potential_set):
 	export: boolean, whether the input is a valid set or not
 	'''
 
-	for i in range(4):
-		set_check = set()
-		for j in potential_set:
-			set_check.add(j[i])
-		if len(set_check) != 1 and len(set_check) != 3:
-			return False
+	card_one, card_two, card_three = (encode(card) for card in potential_set)
 
-	return True	
+	return is_set(card_one, card_two, card_three)
 
 def complete_set(card_one, card_two):
 	'''
@@ -50,16 +123,7 @@ def complete_set(card_one, card_two):
 		card_three: tuple card that completes the set
 	'''
 
-	card_three = []
-
-	for i in range(4):
-		if card_one[i] == card_two[i]:
-			card_three.append(card_one[i])
-		else:
-			diff_card = {0, 1, 2} - {card_one[i]} - {card_two[i]}
-			card_three.append(diff_card.pop())
-
-	return tuple(card_three)
+	return CARDS[third_card(encode(card_one), encode(card_two))]
 
 
 def generate_players(num_players):
@@ -138,14 +202,11 @@ def find_set(table):
 		else returns False
 	'''
 
-	for card_one in range(len(table)):
-		for card_two in range(card_one+1, len(table)):
-			card_three = complete_set(table[card_one], table[card_two])
-			if card_three in table:
-				found_set = [table[card_one], table[card_two], tuple(card_three)]
-				return found_set
+	found_set = find_set_ints([encode(card) for card in table])
+	if not found_set:
+		return False
 
-	return False
+	return [CARDS[card] for card in found_set]
 
 def winner(players):
 	'''
@@ -181,7 +242,7 @@ def play_game(num_players):
 	output: a winner
 	'''
 
-	deck = generate_deck()
+	deck = list(range(NUM_CARDS))
 	players = generate_players(num_players)
 	table = []
 	[table.append(deal_card(deck)) for _ in range(12)]
@@ -193,7 +254,7 @@ def play_game(num_players):
 			else:
 				break
 		turn = player_turn(players)
-		found_set = find_set(table)
+		found_set = find_set_ints(table)
 		if not found_set:
 			if len(table) < 12:
 				return winner(players)
@@ -202,7 +263,7 @@ def play_game(num_players):
 			else:
 				return winner(players)
 		else:
-			players[turn]["sets"].append(found_set)
+			players[turn]["sets"].append([CARDS[card] for card in found_set])
 			table = [card for card in table if card not in found_set]
 
 	return winner(players)
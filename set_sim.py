@@ -0,0 +1,241 @@
+import argparse
+import concurrent.futures
+import time
+import numpy as np
+
+import set_game
+
+
+CHUNK_SIZE = 1000
+TABLE_SIZE = 12
+# every loop of a game either takes a set (at most 27), deals 3 more cards
+# (at most 23, from the 69 left after the first 12) or ends the game
+MAX_TURNS = 27 + 23 + 1
+
+
+class Results:
+    '''
+    Outcomes of a batch of simulated games, one row per game.
+
+    Attributes:
+        means: a (games, players) float64 array of each player's skill mean
+        stds: a (games, players) float64 array of each player's skill
+            standard deviation
+        sets: a (games, players) int16 array of the sets each player found
+        winners: an int16 array with the winning player of each game, the
+            first player with the most sets like set_game.winner, or -1 if
+            nobody found a set
+        turns: an int16 array with the number of turns each game took
+        no_sets: an int16 array with the number of times each game's table
+            had no set
+        cards_left: an int16 array with the cards left on the table at the
+            end of each game
+    '''
+
+    def __init__(self, means, stds, sets, turns, no_sets, cards_left):
+        self.means = means
+        self.stds = stds
+        self.sets = sets
+        self.turns = turns
+        self.no_sets = no_sets
+        self.cards_left = cards_left
+        self.winners = np.where(sets.max(axis = 1) > 0, sets.argmax(axis = 1),
+                                -1).astype(np.int16)
+
+
+    def __len__(self):
+        return len(self.winners)
+
+
+    @classmethod
+    def concat(cls, results):
+        '''
+        Concatenates results in order.
+        '''
+
+        return cls(*(np.concatenate([getattr(r, name) for r in results])
+                     for name in ("means", "stds", "sets", "turns", "no_sets",
+                                  "cards_left")))
+
+
+    @property
+    def num_players(self):
+        return self.sets.shape[1]
+
+
+    def win_counts(self):
+        '''
+        Games won per player seat.
+
+        Outputs:
+            an int64 array indexed by player
+        '''
+
+        return np.bincount(self.winners[self.winners >= 0],
+                           minlength = self.num_players)
+
+
+    def wins_by_skill_rank(self):
+        '''
+        The fraction of games won by the player with the highest skill mean,
+        the second highest, and so on.
+
+        Outputs:
+            a float64 array indexed by rank, 0 being the highest mean
+        '''
+
+        # rank of each player within its game, 0 for the highest mean
+        ranks = np.argsort(np.argsort(-self.means, axis = 1), axis = 1)
+        won = self.winners >= 0
+        winner_ranks = ranks[np.flatnonzero(won), self.winners[won]]
+
+        return np.bincount(winner_ranks, minlength = self.num_players) / max(len(self), 1)
+
+
+    def summary(self):
+        '''
+        Headline statistics of the batch.
+
+        Outputs:
+            a json-serializable dictionary
+        '''
+
+        return {
+            "games": len(self),
+            "players": self.num_players,
+            "win_counts": self.win_counts().tolist(),
+            "wins_by_skill_rank": self.wins_by_skill_rank().tolist(),
+            "mean_sets_per_player": (self.sets.sum(axis = 0) / max(len(self), 1)).tolist(),
+            "mean_turns": float(self.turns.mean()) if len(self) else 0.0,
+            "mean_cards_left": float(self.cards_left.mean()) if len(self) else 0.0,
+            "games_with_no_set": int((self.no_sets > 0).sum()),
+            "no_set_per_game": float(self.no_sets.mean()) if len(self) else 0.0,
+        }
+
+
+def simulate_chunk(seed, num_games, num_players):
+    '''
+    Plays num_games games of set with the rules of set_game.play_game on one
+    random stream. Decks are shuffled and player skills and rolls drawn for
+    the whole chunk up front, so each game is a pass over integer cards.
+
+    Inputs:
+        seed: a numpy.random.SeedSequence, or anything default_rng accepts
+        num_games: an integer
+        num_players: an integer
+
+    Outputs:
+        a Results
+    '''
+
+    rng = np.random.default_rng(seed)
+    means, stds = rng.random((2, num_games, num_players))
+    decks = rng.permuted(np.tile(np.arange(set_game.NUM_CARDS), (num_games, 1)),
+                         axis = 1).tolist()
+    rolls = rng.normal(means[:, None, :], stds[:, None, :],
+                       size = (num_games, MAX_TURNS, num_players))
+    turn_order = rolls.argmax(axis = 2).tolist()
+
+    sets = np.zeros((num_games, num_players), dtype = np.int16)
+    turns = np.zeros(num_games, dtype = np.int16)
+    no_sets = np.zeros(num_games, dtype = np.int16)
+    cards_left = np.zeros(num_games, dtype = np.int16)
+    find_set = set_game.find_set_ints
+
+    for game, (deck, order) in enumerate(zip(decks, turn_order)):
+        table = deck[:TABLE_SIZE]
+        mask = set_game.table_mask(table)
+        dealt = TABLE_SIZE
+        found = [0] * num_players
+        turn = 0
+        empty = 0
+
+        while table:
+            while len(table) < TABLE_SIZE and dealt < len(deck):
+                table.append(deck[dealt])
+                mask |= 1 << deck[dealt]
+                dealt += 1
+            player = order[turn]
+            turn += 1
+
+            found_set = find_set(table, mask)
+            if not found_set:
+                empty += 1
+                if len(table) < TABLE_SIZE or dealt == len(deck):
+                    break
+                table.extend(deck[dealt:dealt + 3])
+                mask |= set_game.table_mask(deck[dealt:dealt + 3])
+                dealt += 3
+            else:
+                found[player] += 1
+                mask &= ~set_game.table_mask(found_set)
+                table = [card for card in table if card not in found_set]
+
+        sets[game] = found
+        turns[game] = turn
+        no_sets[game] = empty
+        cards_left[game] = len(table)
+
+    return Results(means, stds, sets, turns, no_sets, cards_left)
+
+
+def _simulate_chunk(args):
+    return simulate_chunk(*args)
+
+
+def simulate(num_games, num_players, seed = 0, workers = None,
+             chunk_size = CHUNK_SIZE):
+    '''
+    Simulates many games of set across a process pool. Games are split into
+    fixed-size chunks, and chunk i always draws from the i-th stream spawned
+    from seed, so results only depend on seed and chunk_size, not on the
+    number of workers.
+
+    Inputs:
+        num_games: an integer
+        num_players: an integer
+        seed: an integer seed
+        workers: an integer, the number of worker processes. Defaults to the
+            number of CPUs, 1 simulates in this process.
+        chunk_size: an integer, the games per chunk
+
+    Outputs:
+        a Results, in game order
+    '''
+
+    sizes = [min(chunk_size, num_games - start)
+             for start in range(0, num_games, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    chunks = [(s, size, num_players) for s, size in zip(seeds, sizes)]
+
+    if workers == 1 or len(chunks) <= 1:
+        results = [_simulate_chunk(chunk) for chunk in chunks]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers = workers) as pool:
+            results = list(pool.map(_simulate_chunk, chunks))
+
+    if not results:
+        return simulate_chunk(seed, 0, num_players)
+
+    return Results.concat(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Simulate many games of set.")
+    parser.add_argument("-n", "--games", type = int, default = 100000)
+    parser.add_argument("-p", "--players", type = int, default = 4)
+    parser.add_argument("-s", "--seed", type = int, default = 0)
+    parser.add_argument("-w", "--workers", type = int, default = None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = simulate(args.games, args.players, args.seed, args.workers)
+    elapsed = time.perf_counter() - start
+
+    for key, value in results.summary().items():
+        print("{}: {}".format(key, value))
+    print("games/second: {:.0f}".format(len(results) / elapsed))
+
+
+if __name__ == "__main__":
+    main()
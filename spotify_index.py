@@ -0,0 +1,162 @@
+import bisect
+import itertools
+
+
+class ArtistIndex:
+    '''
+    Precomputed listening totals for answering many queries against one
+    streaming history. Per-artist totals, per-artist track rankings and the
+    global artist ranking are built once and kept sorted, so top artists, top
+    songs and time listened don't re-iterate the history. New plays update
+    the index incrementally with add_play.
+
+    Rankings break ties by first appearance, like topk. Artists are ranked by
+    their hours rounded to two decimal places, the same key
+    parse_spotify.top_artists ranks a history dictionary by, so both give
+    the same order.
+
+    Attributes:
+        tracks: a dictionary of artists to dictionaries of songs to minutes,
+            in the same structure as the return of parse_stream
+        totals: a dictionary of artists to total minutes
+    '''
+
+    def __init__(self, history = None):
+        '''
+        Inputs:
+            history: an optional dictionary of artists, the return of
+                parse_stream
+        '''
+
+        self.tracks = dict()
+        self.totals = dict()
+        self._seq = itertools.count()
+        self._artist_seq = dict()
+        self._track_seq = dict()
+        # sorted lists of (-minutes, seq, name), and (-hours, seq, name) for
+        # artists
+        self._artists = []
+        self._songs = dict()
+
+        for artist, songs in (history or {}).items():
+            self._artist_seq[artist] = next(self._seq)
+            self.tracks[artist] = dict(songs)
+            self.totals[artist] = sum(songs.values())
+            seqs = self._track_seq[artist] = dict()
+            for track in songs:
+                seqs[track] = next(self._seq)
+            self._songs[artist] = sorted((-minutes, seqs[track], track)
+                                         for track, minutes in songs.items())
+
+        self._artists = sorted((-_hours(total), self._artist_seq[artist], artist)
+                               for artist, total in self.totals.items())
+
+
+    @classmethod
+    def from_table(cls, table):
+        '''
+        Builds an index from a spotify_table.StreamTable.
+        '''
+
+        return cls(table.to_history())
+
+
+    def __contains__(self, artist):
+        return artist in self.totals
+
+
+    def __len__(self):
+        return len(self.totals)
+
+
+    def add_play(self, artist, track, ms_played):
+        '''
+        Adds a play to the index, updating totals and rankings in place.
+
+        Inputs:
+            artist: a string, the artist name
+            track: a string, the track name
+            ms_played: an integer, the milliseconds played
+        '''
+
+        minutes = ms_played / 60000
+
+        if artist not in self.totals:
+            self._artist_seq[artist] = next(self._seq)
+            self.tracks[artist] = dict()
+            self._track_seq[artist] = dict()
+            self._songs[artist] = []
+            self.totals[artist] = 0
+        else:
+            _remove(self._artists, (-_hours(self.totals[artist]),
+                                    self._artist_seq[artist], artist))
+
+        songs = self.tracks[artist]
+        seqs = self._track_seq[artist]
+        if track not in songs:
+            seqs[track] = next(self._seq)
+            songs[track] = 0
+        else:
+            _remove(self._songs[artist], (-songs[track], seqs[track], track))
+
+        songs[track] += minutes
+        # summed like parse_spotify.find_amount_listened, so the rounded
+        # hours match to the last bit
+        self.totals[artist] = sum(songs.values())
+        bisect.insort(self._songs[artist], (-songs[track], seqs[track], track))
+        bisect.insort(self._artists, (-_hours(self.totals[artist]),
+                                      self._artist_seq[artist], artist))
+
+
+    def extend(self, plays):
+        '''
+        Adds rows of a StreamingHistory.json to the index.
+
+        Inputs:
+            plays: an iterable of dictionaries with artistName, trackName
+                and msPlayed
+        '''
+
+        for play in plays:
+            self.add_play(play["artistName"], play["trackName"], play["msPlayed"])
+
+
+    def total_listened(self, artist):
+        '''
+        The total hours listened to an artist, rounded to two decimal places,
+        see parse_spotify.find_amount_listened.
+        '''
+
+        return _hours(self.totals[artist])
+
+
+    def top_songs(self, artist, maxsize = 10):
+        '''
+        An artist's most listened songs, see parse_spotify.artist_top_songs.
+
+        Outputs:
+            a list of (minutes, song name) tuples, largest first
+        '''
+
+        return [(-minutes, track) for minutes, _, track in
+                self._songs[artist][:maxsize]]
+
+
+    def top_artists(self, maxsize = 10):
+        '''
+        The most listened artists, see parse_spotify.top_artists.
+
+        Outputs:
+            a list of (hours, artist name) tuples, largest first. Hours are
+                rounded to two decimal places.
+        '''
+
+        return [(-hours, artist) for hours, _, artist in self._artists[:maxsize]]
+
+
+def _hours(minutes):
+    return round(minutes / 60, 2)
+
+
+def _remove(ranking, entry):
+    del ranking[bisect.bisect_left(ranking, entry)]
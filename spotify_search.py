@@ -0,0 +1,217 @@
+import bisect
+import unicodedata
+
+
+def normalize(text):
+    '''
+    Folds a name for lookups: case-insensitive, diacritic-insensitive, and
+    with runs of whitespace collapsed, so "Björk" and " bjork" match.
+
+    Inputs:
+        text: a string
+
+    Outputs:
+        the normalized string
+    '''
+
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+
+    return " ".join(stripped.casefold().split())
+
+
+def deletes(key, max_edits):
+    '''
+    Every string obtained by deleting up to max_edits characters from key.
+    '''
+
+    found = {key}
+    frontier = {key}
+    for _ in range(max_edits):
+        frontier = {k[:i] + k[i + 1:] for k in frontier for i in range(len(k))}
+        found |= frontier
+
+    return found
+
+
+def edit_distance(a, b, limit):
+    '''
+    Levenshtein distance between a and b, or limit + 1 if it exceeds limit.
+    '''
+
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+
+    return previous[-1]
+
+
+class KeyIndex:
+    '''
+    Lookup structure over a set of names, built once. Exact lookups go
+    through a dictionary of normalized keys, prefix lookups bisect a sorted
+    array of normalized keys (a flat, compact stand-in for a trie), and fuzzy
+    lookups use a symmetric-delete index, so none of them scan every name.
+    '''
+
+    def __init__(self, items, max_edits = 1):
+        '''
+        Inputs:
+            items: an iterable of (name, value) pairs. Values sharing a
+                normalized name are all returned together.
+            max_edits: an integer, the largest edit distance fuzzy lookups
+                can match
+        '''
+
+        self.max_edits = max_edits
+        self._values = dict()
+        for name, value in items:
+            self._values.setdefault(normalize(name), []).append(value)
+
+        self._keys = sorted(self._values)
+        self._deletes = dict()
+        for key in self._keys:
+            for variant in deletes(key, max_edits):
+                self._deletes.setdefault(variant, []).append(key)
+
+
+    def __len__(self):
+        return len(self._values)
+
+
+    def exact(self, query):
+        '''
+        Values whose normalized name equals the normalized query.
+
+        Outputs:
+            a list of values, empty if nothing matches
+        '''
+
+        return list(self._values.get(normalize(query), ()))
+
+
+    def prefix(self, query, limit = 10):
+        '''
+        Values whose normalized name starts with the normalized query, in
+        alphabetical order of the normalized names.
+
+        Inputs:
+            query: a string
+            limit: an integer, the most values to return
+
+        Outputs:
+            a list of values
+        '''
+
+        query = normalize(query)
+        found = []
+        i = bisect.bisect_left(self._keys, query)
+
+        while i < len(self._keys) and len(found) < limit:
+            key = self._keys[i]
+            if not key.startswith(query):
+                break
+            found.extend(self._values[key][:limit - len(found)])
+            i += 1
+
+        return found
+
+
+    def fuzzy(self, query, max_edits = None, limit = 10):
+        '''
+        Values whose normalized name is within max_edits edits of the
+        normalized query, closest first.
+
+        Inputs:
+            query: a string
+            max_edits: an integer, at most the max_edits the index was built
+                with, which is the default
+            limit: an integer, the most values to return
+
+        Outputs:
+            a list of (distance, value) tuples
+        '''
+
+        if max_edits is None or max_edits > self.max_edits:
+            max_edits = self.max_edits
+        query = normalize(query)
+
+        candidates = set()
+        for variant in deletes(query, max_edits):
+            candidates.update(self._deletes.get(variant, ()))
+
+        scored = []
+        for key in candidates:
+            distance = edit_distance(query, key, max_edits)
+            if distance <= max_edits:
+                scored.append((distance, key))
+        scored.sort()
+
+        found = []
+        for distance, key in scored:
+            for value in self._values[key]:
+                if len(found) == limit:
+                    return found
+                found.append((distance, value))
+
+        return found
+
+
+class SearchIndex:
+    '''
+    Type-ahead search over the artists and tracks of a streaming history.
+
+    Attributes:
+        artists: a KeyIndex of artist names, whose values are artist names as
+            they appear in the history
+        tracks: a KeyIndex of track names, whose values are (artist name,
+            track name) tuples
+    '''
+
+    def __init__(self, history, max_edits = 1):
+        '''
+        Inputs:
+            history: a dictionary of artists, the return of parse_stream
+            max_edits: an integer, the largest edit distance fuzzy lookups
+                can match
+        '''
+
+        self.artists = KeyIndex(((artist, artist) for artist in history),
+                                max_edits)
+        self.tracks = KeyIndex(((track, (artist, track))
+                                for artist, songs in history.items()
+                                for track in songs), max_edits)
+
+
+    def resolve_artist(self, query):
+        '''
+        Finds the history key of the artist a user most likely meant: an
+        exact normalized match if there is one, otherwise the closest fuzzy
+        match.
+
+        Inputs:
+            query: a string
+
+        Outputs:
+            an artist name usable with find_amount_listened and
+                artist_top_songs, or None if nothing is close enough
+        '''
+
+        exact = self.artists.exact(query)
+        if exact:
+            return exact[0]
+
+        fuzzy = self.artists.fuzzy(query, limit = 1)
+        if fuzzy:
+            return fuzzy[0][1]
+
+        return None
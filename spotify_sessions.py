@@ -0,0 +1,159 @@
+import numpy as np
+
+
+class Sessions:
+    '''
+    Listening sessions of a streaming history. Plays are sorted by end time
+    once, then split into sessions wherever the gap between one play ending
+    and the next starting is longer than gap_minutes. Every step after the
+    sort is a linear NumPy pass.
+
+    Play start times are estimated as end time minus msPlayed, at the
+    history's minute precision.
+
+    Attributes:
+        table: the spotify_table.StreamTable the sessions were built from
+        order: an int64 array, the play indices of table in end-time order.
+            The per-play arrays below follow this order.
+        artist: an int32 array with the artist id of each play
+        skipped: a bool array, whether each play was shorter than skip_ms
+        session: an int64 array with the session number of each play
+        start: a datetime64[m] array with the start of each session
+        end: a datetime64[m] array with the end of each session
+        plays: an int64 array with the number of plays in each session
+    '''
+
+    def __init__(self, table, gap_minutes = 30, skip_ms = 30000):
+        '''
+        Inputs:
+            table: a spotify_table.StreamTable
+            gap_minutes: an integer, the longest pause within a session
+            skip_ms: an integer, plays shorter than this count as skips
+        '''
+
+        self.table = table
+        self.order = np.argsort(table.end_time, kind = "stable")
+        self.artist = table.artist[self.order]
+        ms_played = table.ms_played[self.order]
+        self.skipped = ms_played < skip_ms
+
+        end = table.end_time[self.order].view(np.int64)
+        start = end - ms_played // 60000
+
+        first = np.ones(len(end), dtype = bool)
+        first[1:] = start[1:] - end[:-1] > gap_minutes
+        self._first = first
+        self.session = np.cumsum(first) - 1
+
+        starts = np.flatnonzero(first)
+        self.start = start[first].astype("datetime64[m]")
+        if len(end):
+            self.end = np.maximum.reduceat(end, starts).astype("datetime64[m]")
+        else:
+            self.end = np.zeros(0, dtype = "datetime64[m]")
+        self.plays = np.diff(np.append(starts, len(end)))
+
+
+    def __len__(self):
+        return len(self.plays)
+
+
+    def durations(self):
+        '''
+        The length of each session in minutes.
+
+        Outputs:
+            an int64 array
+        '''
+
+        return (self.end - self.start).astype(np.int64)
+
+
+    def length_distribution(self):
+        '''
+        How many sessions had each number of plays.
+
+        Outputs:
+            an int64 array, where entry n is the number of sessions with n
+                plays
+        '''
+
+        return np.bincount(self.plays)
+
+
+    def duration_percentiles(self, q = (50, 90, 99)):
+        '''
+        Percentiles of session length in minutes.
+
+        Inputs:
+            q: a sequence of percentiles
+
+        Outputs:
+            a dictionary of percentiles to minutes
+        '''
+
+        if len(self) == 0:
+            return {p: 0.0 for p in q}
+
+        return dict(zip(q, np.percentile(self.durations(), q).tolist()))
+
+
+    def skip_rates(self):
+        '''
+        The fraction of each artist's plays that were skipped.
+
+        Outputs:
+            a dictionary of artist names to floats, for every artist with at
+                least one play
+        '''
+
+        num_artists = len(self.table.artists)
+        plays = np.bincount(self.artist, minlength = num_artists)
+        skips = np.bincount(self.artist[self.skipped], minlength = num_artists)
+        played = np.flatnonzero(plays)
+
+        return dict(zip([self.table.artists[i] for i in played.tolist()],
+                        (skips[played] / plays[played]).tolist()))
+
+
+    def binge_runs(self, min_length = 5):
+        '''
+        Finds runs of consecutive plays of the same artist within a session.
+
+        Inputs:
+            min_length: an integer, the fewest plays counted as a binge
+
+        Outputs:
+            a list of (artist name, number of plays, first end time)
+                tuples, in time order. The first end time is the
+                datetime64[m] end of the run's first play.
+        '''
+
+        if len(self.artist) == 0:
+            return []
+
+        new_run = self._first.copy()
+        new_run[1:] |= self.artist[1:] != self.artist[:-1]
+        starts = np.flatnonzero(new_run)
+        lengths = np.diff(np.append(starts, len(self.artist)))
+        binges = starts[lengths >= min_length]
+
+        play_end = self.table.end_time[self.order]
+        return [(self.table.artists[self.artist[i]], int(n), play_end[i])
+                for i, n in zip(binges.tolist(), lengths[lengths >= min_length].tolist())]
+
+
+def sessionize(table, gap_minutes = 30, skip_ms = 30000):
+    '''
+    Splits a streaming history into listening sessions, see Sessions.
+
+    Inputs:
+        table: a spotify_table.StreamTable
+        gap_minutes: an integer, the longest pause within a session
+        skip_ms: an integer, plays shorter than this count as skips
+
+    Outputs:
+        a Sessions
+    '''
+
+    return Sessions(table, gap_minutes, skip_ms)
@@ -0,0 +1,351 @@
+import concurrent.futures
+import glob
+import json
+import os
+import re
+import numpy as np
+
+import periods
+import ytd_loader
+
+
+# the streaming-history families of a Spotify export, most complete first:
+# the extended history under its current and older names, then the account
+# export's last year of plays
+HISTORY_PATTERNS = ("Streaming_History_Audio_*.json", "endsong*.json",
+                    "StreamingHistory*.json")
+NUMBER = re.compile(r"(\d+)")
+
+
+def find_history_files(directory):
+    '''
+    Finds the streaming-history parts of a Spotify export: the
+    Streaming_History_Audio_*.json or endsong_N.json files of the extended
+    streaming history, or the StreamingHistory0..N.json files of the account
+    export. The families cover overlapping periods, so only the first one
+    present in HISTORY_PATTERNS order is used; mixing them would count the
+    same plays twice.
+
+    Inputs:
+        directory: the directory of a Spotify export
+
+    Outputs:
+        a list of file names, sorted by part number
+    '''
+
+    def part_key(file_name):
+        name = os.path.basename(file_name)
+        return [int(n) if n.isdigit() else n for n in NUMBER.split(name)]
+
+    for pattern in HISTORY_PATTERNS:
+        files = glob.glob(os.path.join(directory, pattern))
+        if files:
+            return sorted(files, key = part_key)
+
+    return []
+
+
+def play_fields(play):
+    '''
+    The artist, track, milliseconds played and end time of a play row of
+    either StreamingHistory.json or the extended history.
+
+    Inputs:
+        play: a play dictionary
+
+    Outputs:
+        a tuple (artist, track, ms_played, end_time), or None for extended
+            rows without an artist
+    '''
+
+    if "artistName" in play:
+        return play["artistName"], play["trackName"], play["msPlayed"], \
+            play["endTime"]
+
+    artist_name = play.get("master_metadata_album_artist_name")
+    if artist_name is None:
+        return None
+
+    return artist_name, play["master_metadata_track_name"], play["ms_played"], \
+        play["ts"]
+
+
+def iter_plays(path):
+    '''
+    Streams the play rows of a streaming-history file, or of every part of an
+    export directory in part order, one row at a time. Unlike StreamTable.load
+    only a chunk of each file is held in memory.
+
+    Inputs:
+        path: a single streaming-history file, or an export directory
+
+    Outputs:
+        a generator of (artist, track, ms_played, end_time) tuples, see
+            play_fields
+    '''
+
+    files = find_history_files(path) if os.path.isdir(path) else [path]
+
+    for file_name in files:
+        for play in ytd_loader.iter_items(file_name, key = None):
+            fields = play_fields(play)
+            if fields is not None:
+                yield fields
+
+
+class StreamTable:
+    '''
+    Columnar streaming history. Artists and (artist, track) pairs are
+    interned to integer ids in order of first appearance.
+
+    Attributes:
+        artists: a list of artist names, indexed by artist id
+        track_names: a list of track names, indexed by track id
+        track_artist: an int32 array with the artist id of each track id
+        artist: an int32 array with one artist id per play
+        track: an int32 array with one track id per play
+        ms_played: an int64 array with the milliseconds of each play
+        end_time: a datetime64[m] array with the end time of each play
+    '''
+
+    def __init__(self, plays = ()):
+        '''
+        Builds the table in a single pass over plays. Plays can be rows of
+        either StreamingHistory.json (artistName, trackName, msPlayed,
+        endTime) or the extended history (master_metadata_album_artist_name,
+        master_metadata_track_name, ms_played, ts). Extended rows without an
+        artist, such as podcast episodes, are skipped.
+
+        Inputs:
+            plays: an iterable of play dictionaries
+        '''
+
+        artists = dict()
+        tracks = dict()
+        track_artist = []
+        track = []
+        ms_played = []
+        end_time = []
+
+        for play in plays:
+            fields = play_fields(play)
+            if fields is None:
+                continue
+            artist_name, track_name, ms, end = fields
+
+            artist_id = artists.setdefault(artist_name, len(artists))
+            track_id = tracks.get((artist_id, track_name))
+            if track_id is None:
+                track_id = tracks[(artist_id, track_name)] = len(tracks)
+                track_artist.append(artist_id)
+            track.append(track_id)
+            ms_played.append(ms)
+            # minute precision, drops seconds and the extended history's "Z"
+            end_time.append(end[:16])
+
+        self.artists = list(artists)
+        self.track_names = [name for _, name in tracks]
+        self.track_artist = np.array(track_artist, dtype = np.int32)
+        self.track = np.array(track, dtype = np.int32)
+        self.artist = self.track_artist[self.track]
+        self.ms_played = np.array(ms_played, dtype = np.int64)
+        self.end_time = np.array(end_time, dtype = "datetime64[m]")
+        self._artist_ids = None
+
+
+    def __len__(self):
+        return len(self.track)
+
+
+    @classmethod
+    def from_file(cls, file_name):
+        '''
+        Builds a table from a single streaming-history json file.
+        '''
+
+        with open(file_name, "r", encoding = "utf-8") as f:
+            return cls(json.load(f))
+
+
+    @classmethod
+    def concat(cls, tables):
+        '''
+        Concatenates tables in order, re-interning their ids into one shared
+        set of artists and tracks.
+
+        Inputs:
+            tables: a list of StreamTables
+
+        Outputs:
+            a StreamTable
+        '''
+
+        artists = dict()
+        tracks = dict()
+        track_artist = []
+        track = []
+
+        for table in tables:
+            artist_map = np.array([artists.setdefault(name, len(artists))
+                                   for name in table.artists], dtype = np.int32)
+            track_map = np.empty(len(table.track_names), dtype = np.int32)
+            for i, (artist_id, name) in enumerate(zip(
+                    artist_map[table.track_artist].tolist(), table.track_names)):
+                track_id = tracks.get((artist_id, name))
+                if track_id is None:
+                    track_id = tracks[(artist_id, name)] = len(tracks)
+                    track_artist.append(artist_id)
+                track_map[i] = track_id
+            track.append(track_map[table.track])
+
+        combined = cls()
+        combined.artists = list(artists)
+        combined.track_names = [name for _, name in tracks]
+        combined.track_artist = np.array(track_artist, dtype = np.int32)
+        combined.track = np.concatenate([combined.track] + track)
+        combined.artist = combined.track_artist[combined.track]
+        combined.ms_played = np.concatenate([combined.ms_played] +
+                                            [t.ms_played for t in tables])
+        combined.end_time = np.concatenate([combined.end_time] +
+                                           [t.end_time for t in tables])
+
+        return combined
+
+
+    @classmethod
+    def load(cls, path, workers = None):
+        '''
+        Loads every streaming-history part of a Spotify export. Parts are
+        parsed concurrently on a process pool, each into its own table, and
+        the tables are concatenated in part order.
+
+        Inputs:
+            path: a single streaming-history file, or an export directory
+            workers: an integer, the number of worker processes. Defaults to
+                the number of CPUs, 1 parses in this process.
+
+        Outputs:
+            a StreamTable
+        '''
+
+        if not os.path.isdir(path):
+            return cls.from_file(path)
+
+        files = find_history_files(path)
+        if workers == 1 or len(files) <= 1:
+            tables = [cls.from_file(file_name) for file_name in files]
+        else:
+            with concurrent.futures.ProcessPoolExecutor(max_workers = workers) as pool:
+                tables = list(pool.map(cls.from_file, files))
+
+        return cls.concat(tables)
+
+
+    def track_minutes(self):
+        '''
+        Minutes listened per track id.
+
+        Outputs:
+            a float64 array indexed by track id
+        '''
+
+        return np.bincount(self.track, weights = self.ms_played,
+                           minlength = len(self.track_names)) / 60000
+
+
+    def to_history(self):
+        '''
+        Derives the nested history dictionary returned by
+        parse_spotify.parse_stream.
+
+        Outputs:
+            a dictionary of artists keys. Artists keys link to dictionaries of
+                songs, which link to minutes of total streaming time.
+        '''
+
+        history = dict()
+        minutes = self.track_minutes().tolist()
+
+        for track_id, artist_id in enumerate(self.track_artist.tolist()):
+            songs = history.setdefault(self.artists[artist_id], dict())
+            songs[self.track_names[track_id]] = minutes[track_id]
+
+        return history
+
+
+    def artist_id(self, artist):
+        '''
+        The id of an artist name, raising KeyError if it never played.
+        '''
+
+        if self._artist_ids is None:
+            self._artist_ids = {name: i for i, name in enumerate(self.artists)}
+
+        return self._artist_ids[artist]
+
+
+    def _plays(self, artist):
+        if artist is None:
+            return self.end_time, self.ms_played
+        mask = self.artist == self.artist_id(artist)
+        return self.end_time[mask], self.ms_played[mask]
+
+
+    def heatmap(self, artist = None):
+        '''
+        Minutes listened per hour of day and day of week. Plays are counted
+        in the hour they ended.
+
+        Inputs:
+            artist: an optional artist name to only count that artist
+
+        Outputs:
+            a (24, 7) float64 array, indexed by [hour, weekday] with Monday
+                as weekday 0
+        '''
+
+        end_time, ms_played = self._plays(artist)
+        hours = end_time.astype("datetime64[h]").view(np.int64) % 24
+        weekdays = periods.weekday(end_time.astype("datetime64[D]"))
+        minutes = np.bincount(hours * 7 + weekdays, weights = ms_played,
+                              minlength = 24 * 7) / 60000
+
+        return minutes.reshape(24, 7)
+
+
+    def _series(self, unit, artist):
+        end_time, ms_played = self._plays(artist)
+        bins, ms = periods.series(end_time.astype(unit), weights = ms_played)
+
+        return bins, ms / 60000
+
+
+    def minutes_per_day(self, artist = None):
+        '''
+        Minutes listened per day, from the first to the last day with a play.
+        Days without plays are included with 0 minutes.
+
+        Inputs:
+            artist: an optional artist name to only count that artist
+
+        Outputs:
+            a tuple (days, minutes): a datetime64[D] array and a float64 array
+        '''
+
+        return self._series("datetime64[D]", artist)
+
+
+    def minutes_per_month(self, artist = None):
+        '''
+        Minutes listened per month, from the first to the last month with a
+        play. Months without plays are included with 0 minutes.
+
+        Inputs:
+            artist: an optional artist name to only count that artist
+
+        Outputs:
+            a tuple (months, minutes): a datetime64[M] array and a float64
+                array
+        '''
+
+        return self._series("datetime64[M]", artist)
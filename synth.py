@@ -0,0 +1,302 @@
+import argparse
+import datetime
+import json
+import os
+import random
+
+
+SIZES = (10_000, 100_000, 1_000_000, 10_000_000)
+TARGETING_TYPES = ("Interests", "Follower look-alikes", "Events", "Keywords",
+                   "Behaviors", "Locations", "Age", "Gender", "Platforms",
+                   "Tailored audiences (lists)", "Tailored audiences (web)")
+IMPRESSIONS_PER_AD = 50
+START = datetime.datetime(2018, 1, 1)
+
+
+def skewed(rng, cardinality, skew = 2.0):
+    '''
+    Draws an index in range(cardinality), skewed towards small indices so a
+    few advertisers, artists or tags dominate, as in real exports.
+    '''
+
+    return int(cardinality * rng.random() ** skew)
+
+
+def timestamp(rng, span_days):
+    '''
+    A random datetime within span_days of START.
+    '''
+
+    return START + datetime.timedelta(seconds = rng.randrange(span_days * 86400))
+
+
+def write_twitter(file_name, num_records, num_advertisers = 1000,
+                  num_values = 5000, span_days = 365, seed = 0):
+    '''
+    Writes a synthetic ad-impressions.js, YTD prefix included.
+
+    Inputs:
+        file_name: the file to write
+        num_records: an integer, the number of impressions
+        num_advertisers: an integer, the number of distinct advertisers
+        num_values: an integer, the number of distinct targeting values
+        span_days: an integer, the number of days impressions are spread over
+        seed: an integer seed, the same seed writes the same file
+    '''
+
+    rng = random.Random(seed)
+
+    with open(file_name, "w") as f:
+        f.write("window.YTD.ad_impressions.part0 = [")
+        for start in range(0, num_records, IMPRESSIONS_PER_AD):
+            impressions = []
+            for _ in range(min(IMPRESSIONS_PER_AD, num_records - start)):
+                impression = {
+                    "deviceInfo": {"osType": rng.choice(("Ios", "Android", "Desktop"))},
+                    "displayLocation": rng.choice(("TimelineHome", "SearchTweets", "ProfileTweets")),
+                    "advertiserInfo": {
+                        "advertiserName": "Advertiser {}".format(skewed(rng, num_advertisers)),
+                    },
+                    "impressionTime": timestamp(rng, span_days).strftime("%Y-%m-%d %H:%M:%S"),
+                }
+                impression["advertiserInfo"]["screenName"] = "@" + \
+                    impression["advertiserInfo"]["advertiserName"].replace(" ", "")
+                if rng.random() < 0.8:
+                    criteria = []
+                    for _ in range(rng.randint(1, 6)):
+                        target = {"targetingType": rng.choice(TARGETING_TYPES)}
+                        if rng.random() < 0.9:
+                            target["targetingValue"] = "value{}".format(skewed(rng, num_values))
+                        criteria.append(target)
+                    impression["matchedTargetingCriteria"] = criteria
+                impressions.append(impression)
+            if start > 0:
+                f.write(",")
+            json.dump({"ad": {"adsUserData": {"adImpressions": {"impressions": impressions}}}}, f)
+        f.write("]")
+
+
+def write_spotify(file_name, num_records, num_artists = 2000,
+                  tracks_per_artist = 20, span_days = 365, seed = 0):
+    '''
+    Writes a synthetic StreamingHistory.json.
+
+    Inputs:
+        file_name: the file to write
+        num_records: an integer, the number of plays
+        num_artists: an integer, the number of distinct artists
+        tracks_per_artist: an integer, the number of distinct tracks per artist
+        span_days: an integer, the number of days plays are spread over
+        seed: an integer seed, the same seed writes the same file
+    '''
+
+    rng = random.Random(seed)
+
+    with open(file_name, "w") as f:
+        f.write("[")
+        for i in range(num_records):
+            artist = skewed(rng, num_artists)
+            play = {
+                "endTime": timestamp(rng, span_days).strftime("%Y-%m-%d %H:%M"),
+                "artistName": "Artist {}".format(artist),
+                "trackName": "Track {} by {}".format(skewed(rng, tracks_per_artist), artist),
+                "msPlayed": rng.randint(0, 30000) if rng.random() < 0.3 else rng.randint(60000, 300000),
+            }
+            if i > 0:
+                f.write(",")
+            json.dump(play, f)
+        f.write("]")
+
+
+def write_tinder(file_name, num_records, seed = 0):
+    '''
+    Writes a synthetic Tinder data.json. Records are Usage entries, split
+    evenly between the six Usage series, one entry per series per day.
+
+    Inputs:
+        file_name: the file to write
+        num_records: an integer, the number of Usage entries
+        seed: an integer seed, the same seed writes the same file
+    '''
+
+    rng = random.Random(seed)
+    days = [(START.date() + datetime.timedelta(days = i)).isoformat()
+            for i in range(max(1, num_records // 6))]
+    usage = dict()
+
+    for series, high in (("app_opens", 40), ("messages_sent", 30),
+                         ("messages_received", 30), ("matches", 5),
+                         ("swipes_likes", 60), ("swipes_passes", 100)):
+        usage[series] = {day: rng.randint(0, high) for day in days}
+    usage["swipes_likes"][days[0]] += 1
+
+    with open(file_name, "w") as f:
+        json.dump({"Usage": usage, "User": {}}, f)
+
+
+def write_tumblr(file_name, num_records, num_tags = 500, num_blogs = 3,
+                 span_days = 365, seed = 0):
+    '''
+    Writes a synthetic Tumblr export. num_records is split between dashboard
+    posts, the three ad-analytics sections and active times.
+
+    Inputs:
+        file_name: the file to write
+        num_records: an integer, the number of records
+        num_tags: an integer, the number of distinct tags
+        num_blogs: an integer, the number of the user's blogs
+        span_days: an integer, the number of days records are spread over
+        seed: an integer seed, the same seed writes the same file
+    '''
+
+    rng = random.Random(seed)
+    blogs = ["blog{}".format(i) for i in range(num_blogs)]
+
+    def serve_time():
+        if rng.random() < 0.05:
+            return "\\N"
+        return timestamp(rng, span_days).strftime("%Y-%m-%d %H:%M:%S")
+
+    def ad():
+        viewed = rng.random() < 0.6
+        return {
+            "serve_time": serve_time(),
+            "viewed": "true" if viewed else "false",
+            "interacted": "true" if viewed and rng.random() < 0.05 else "false",
+        }
+
+    dashboard = num_records // 2
+    ads = num_records // 8
+
+    data = {
+        "registration_time": "2012-03-04 05:06:07",
+        "last_post_time": "2020-01-02T03:04:05",
+        "unfollows": [{"blog_name": "gone{}".format(i)} for i in range(100)],
+        "last_active_times": [timestamp(rng, span_days).strftime("%Y-%m-%d %H:%M:%S")
+                              for _ in range(max(1, num_records - dashboard - 3 * ads))],
+        "dashboard": [{"post_id": str(i),
+                       "serve_time": timestamp(rng, span_days).strftime("%Y-%m-%d %H:%M:%S")}
+                      for i in range(max(1, dashboard))],
+        "ads_analytics": [ad() for _ in range(max(1, ads))],
+        "gemini_analytics": [ad() for _ in range(ads)],
+        "client_side_ad_analytics": [ad() for _ in range(ads)],
+        "user_interest_profiles": [{"interest": "interest{}".format(i)} for i in range(50)],
+        "blog_names": [{"current_blog_name": blog, "prev_used_blog_name": [blog + "_old"]}
+                       for blog in blogs],
+        "crushes": [{"blog_name": "crush{}".format(i)} for i in range(5)],
+        "crushers": [{blog: [{"blog_name": "crusher{}".format(i)} for i in range(3)]}
+                     for blog in blogs],
+        "most_used_tags": [{"blog_name": rng.choice(blogs), "tag": "tag{}".format(i),
+                            "tag_count": str(rng.randint(1, 10000))}
+                           for i in range(num_tags)],
+    }
+    data["ads_analytics"][0]["serve_time"] = "2018-01-01 00:00:00"
+    data["ads_analytics"][0]["viewed"] = "true"
+
+    with open(file_name, "w") as f:
+        json.dump([{"data": data}], f)
+
+
+WRITERS = {
+    "twitter": (write_twitter, "ad-impressions-{}.js"),
+    "spotify": (write_spotify, "StreamingHistory-{}.json"),
+    "tinder": (write_tinder, "tinder-{}.json"),
+    "tumblr": (write_tumblr, "tumblr-{}.json"),
+}
+# cardinality options of each writer, by command-line flag
+OPTIONS = {
+    "advertisers": ("twitter", "num_advertisers"),
+    "values": ("twitter", "num_values"),
+    "artists": ("spotify", "num_artists"),
+    "tracks": ("spotify", "tracks_per_artist"),
+    "tags": ("tumblr", "num_tags"),
+    "blogs": ("tumblr", "num_blogs"),
+}
+
+
+def add_options(parser):
+    '''
+    Adds a flag for each of OPTIONS to an argparse parser. Flags left unset
+    parse to None and the writer's default is used.
+    '''
+
+    for flag, (platform, name) in OPTIONS.items():
+        parser.add_argument("--" + flag, type = int, default = None,
+                            help = "{} for {} archives".format(name, platform))
+
+
+def options(platform, flags):
+    '''
+    The writer keyword arguments of a platform.
+
+    Inputs:
+        platform: a key of WRITERS
+        flags: a dictionary of OPTIONS flags to values, e.g. read off the
+            arguments parsed with add_options. Flags of other platforms and
+            None values are left out.
+
+    Outputs:
+        a dictionary of keyword arguments for archive
+    '''
+
+    unknown = set(flags) - set(OPTIONS)
+    if unknown:
+        raise TypeError("unknown synth options: {}".format(", ".join(sorted(unknown))))
+
+    kwargs = dict()
+    for flag, value in flags.items():
+        option_platform, name = OPTIONS[flag]
+        if option_platform == platform and value is not None:
+            kwargs[name] = value
+
+    return kwargs
+
+
+def archive(directory, platform, num_records, seed = 0, **kwargs):
+    '''
+    Returns the path of a synthetic archive, writing it only if it doesn't
+    exist yet.
+
+    Inputs:
+        directory: the directory to keep synthetic archives in
+        platform: "twitter", "spotify", "tinder" or "tumblr"
+        num_records: an integer, the archive size
+        seed: an integer seed
+        kwargs: cardinality options passed on to the writer. They are not
+            part of the file name, so keep one directory per configuration.
+
+    Outputs:
+        the archive's file name
+    '''
+
+    writer, pattern = WRITERS[platform]
+    os.makedirs(directory, exist_ok = True)
+    file_name = os.path.join(directory, pattern.format(num_records))
+
+    if not os.path.exists(file_name):
+        writer(file_name + ".tmp", num_records, seed = seed, **kwargs)
+        os.replace(file_name + ".tmp", file_name)
+
+    return file_name
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Write synthetic archives.")
+    parser.add_argument("directory")
+    parser.add_argument("-p", "--platform", choices = sorted(WRITERS),
+                        action = "append")
+    parser.add_argument("-n", "--sizes", type = int, nargs = "+",
+                        default = list(SIZES))
+    parser.add_argument("--seed", type = int, default = 0)
+    add_options(parser)
+    args = parser.parse_args()
+    flags = {flag: getattr(args, flag) for flag in OPTIONS}
+
+    for platform in args.platform or sorted(WRITERS):
+        for size in args.sizes:
+            print(archive(args.directory, platform, size, args.seed,
+                          **options(platform, flags)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import os
+import pickle
+import sys
+import types
+
+import result_cache
+
+
+class Counter:
+    '''
+    A compute function that records how often it ran.
+    '''
+
+    def __init__(self, result):
+        self.result = result
+        self.calls = 0
+
+
+    def __call__(self):
+        self.calls += 1
+        return self.result
+
+
+def write(tmp_path, name, text):
+    file_name = tmp_path / name
+    file_name.write_text(text)
+    return str(file_name)
+
+
+def entry_files(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith(".pkl"))
+
+
+def test_hit_skips_compute(tmp_path):
+    path = write(tmp_path, "in.json", "[1, 2, 3]")
+    cache = result_cache.ResultCache(str(tmp_path / "cache"))
+    compute = Counter({"a": 1})
+
+    assert cache.get_or_compute("ns/v1", path, compute) == {"a": 1}
+    assert cache.get_or_compute("ns/v1", path, compute) == {"a": 1}
+    assert compute.calls == 1
+
+
+def test_namespaces_and_contents_key_separately(tmp_path):
+    path = write(tmp_path, "in.json", "[1]")
+    cache = result_cache.ResultCache(str(tmp_path / "cache"))
+    compute = Counter("x")
+
+    cache.get_or_compute("ns/v1", path, compute)
+    cache.get_or_compute("ns/v2", path, compute)
+    assert compute.calls == 2
+
+    write(tmp_path, "in.json", "[2]")
+    cache.get_or_compute("ns/v1", path, compute)
+    assert compute.calls == 3
+
+
+def test_touched_file_is_rehashed_and_still_hits(tmp_path):
+    path = write(tmp_path, "in.json", "[1, 2, 3]")
+    cache = result_cache.ResultCache(str(tmp_path / "cache"))
+    compute = Counter("x")
+    cache.get_or_compute("ns/v1", path, compute)
+
+    st = os.stat(path)
+    os.utime(path, ns = (st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    hashes = []
+    original = result_cache.content_hash
+    result_cache.content_hash = lambda p: hashes.append(p) or original(p)
+    try:
+        cache.get_or_compute("ns/v1", path, compute)
+        cache.get_or_compute("ns/v1", path, compute)
+    finally:
+        result_cache.content_hash = original
+
+    assert compute.calls == 1
+    assert hashes == [os.path.abspath(path)]
+
+
+def test_processes_sharing_a_directory_keep_each_others_entries(tmp_path):
+    directory = str(tmp_path / "cache")
+    first = write(tmp_path, "a.json", "[1]")
+    second = write(tmp_path, "b.json", "[2]")
+    a = result_cache.ResultCache(directory)
+    b = result_cache.ResultCache(directory)
+    a.get_or_compute("ns/v1", first, Counter("a"))
+    b.get_or_compute("ns/v1", second, Counter("b"))
+
+    fresh = result_cache.ResultCache(directory)
+    compute = Counter(None)
+    assert fresh.get_or_compute("ns/v1", first, compute) == "a"
+    assert fresh.get_or_compute("ns/v1", second, compute) == "b"
+    assert compute.calls == 0
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    directory = str(tmp_path / "cache")
+    paths = [write(tmp_path, "{}.json".format(i), str(i)) for i in range(3)]
+    size = len(pickle.dumps(b"x" * 1000, protocol = pickle.HIGHEST_PROTOCOL))
+    cache = result_cache.ResultCache(directory, max_bytes = 2 * size)
+
+    cache.get_or_compute("ns/v1", paths[0], Counter(b"x" * 1000))
+    cache.get_or_compute("ns/v1", paths[1], Counter(b"x" * 1000))
+    # every entry looks old, then the first one is used again
+    for name in entry_files(directory):
+        os.utime(os.path.join(directory, name), ns = (0, 0))
+    cache.get_or_compute("ns/v1", paths[0], Counter(None))
+
+    cache.get_or_compute("ns/v1", paths[2], Counter(b"y" * 1000))
+
+    compute = Counter(b"z")
+    assert cache.get_or_compute("ns/v1", paths[0], compute) == b"x" * 1000
+    assert cache.get_or_compute("ns/v1", paths[2], compute) == b"y" * 1000
+    assert compute.calls == 0
+    assert cache.get_or_compute("ns/v1", paths[1], compute) == b"z"
+
+
+def test_unknown_files_count_towards_the_limit(tmp_path):
+    directory = str(tmp_path / "cache")
+    os.makedirs(directory)
+    orphan = os.path.join(directory, "orphan.pkl")
+    with open(orphan, "wb") as f:
+        f.write(b"\0" * 2000)
+    os.utime(orphan, ns = (0, 0))
+
+    cache = result_cache.ResultCache(directory, max_bytes = 2500)
+    cache.get_or_compute("ns/v1", write(tmp_path, "in.json", "[1]"),
+                         Counter(b"x" * 1000))
+
+    assert not os.path.exists(orphan)
+    assert len(entry_files(directory)) == 1
+
+
+def test_unloadable_entry_is_a_miss(tmp_path):
+    path = write(tmp_path, "in.json", "[1]")
+    directory = str(tmp_path / "cache")
+    cache = result_cache.ResultCache(directory)
+    cache.get_or_compute("ns/v1", path, Counter("x"))
+
+    # an entry pickled by a module that no longer exists
+    module = types.ModuleType("vanished_module")
+    exec("class Stats:\n    pass", module.__dict__)
+    module.Stats.__module__ = module.__name__
+    sys.modules[module.__name__] = module
+    data = pickle.dumps(module.Stats())
+    del sys.modules[module.__name__]
+    with open(os.path.join(directory, entry_files(directory)[0]), "wb") as f:
+        f.write(data)
+    compute = Counter("y")
+
+    assert cache.get_or_compute("ns/v1", path, compute) == "y"
+    assert compute.calls == 1
+    assert cache.get_or_compute("ns/v1", path, compute) == "y"
+    assert compute.calls == 1
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+import set_sim
+
+
+FIELDS = ("means", "stds", "sets", "turns", "no_sets", "cards_left", "winners")
+
+
+def assert_same(a, b):
+    for name in FIELDS:
+        x, y = getattr(a, name), getattr(b, name)
+        assert x.dtype == y.dtype, name
+        np.testing.assert_array_equal(x, y, err_msg = name)
+
+
+@pytest.mark.parametrize("num_games", [50, 45])
+def test_workers_do_not_change_results(num_games):
+    # small chunks so the pool gets several, the last one partial for 45
+    serial = set_sim.simulate(num_games, 3, seed = 7, workers = 1, chunk_size = 10)
+    pooled = set_sim.simulate(num_games, 3, seed = 7, workers = 2, chunk_size = 10)
+
+    assert len(serial) == num_games
+    assert_same(serial, pooled)
+
+
+def test_chunks_do_not_depend_on_num_games():
+    short = set_sim.simulate(20, 4, seed = 3, workers = 1, chunk_size = 10)
+    longer = set_sim.simulate(35, 4, seed = 3, workers = 1, chunk_size = 10)
+
+    for name in FIELDS:
+        np.testing.assert_array_equal(getattr(short, name),
+                                      getattr(longer, name)[:20], err_msg = name)
+
+
+def test_seed_changes_results():
+    a = set_sim.simulate(20, 3, seed = 1, workers = 1)
+    b = set_sim.simulate(20, 3, seed = 2, workers = 1)
+
+    assert not np.array_equal(a.means, b.means)
+
+
+def test_no_games():
+    results = set_sim.simulate(0, 3, workers = 2)
+
+    assert len(results) == 0
+    assert results.sets.shape == (0, 3)
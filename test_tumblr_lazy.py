@@ -0,0 +1,116 @@
+import json
+import random
+
+import pytest
+
+import parse_tumblr
+import synth
+import tumblr_lazy
+
+
+CHUNK_SIZES = [1, 2, 3, 4, 7, 64, tumblr_lazy.CHUNK_SIZE]
+# strings made of these exercise escaped quotes and brackets inside strings
+STRING_CHARS = '\\"[]{}ab'
+
+
+def reference_depths(text, max_depth):
+    '''
+    bracket_depths one character at a time.
+    '''
+
+    found = []
+    depth = 0
+    in_string = False
+    escaped = False
+    for i, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "[{":
+            depth += 1
+            if depth - 1 <= max_depth:
+                found.append((i, depth))
+        elif char in "]}":
+            depth -= 1
+            if depth <= max_depth:
+                found.append((i, depth))
+
+    return found
+
+
+def random_value(rng, depth = 0):
+    def string():
+        return "".join(rng.choice(STRING_CHARS) for _ in range(rng.randint(0, 6)))
+
+    r = rng.random()
+    if depth > 4 or r < 0.4:
+        return string()
+    if r < 0.7:
+        return [random_value(rng, depth + 1) for _ in range(rng.randint(0, 3))]
+    return {string(): random_value(rng, depth + 1) for _ in range(rng.randint(0, 3))}
+
+
+@pytest.mark.parametrize("seed", range(8))
+@pytest.mark.parametrize("max_depth", [0, 1, 3])
+def test_bracket_depths_matches_reference(seed, max_depth):
+    rng = random.Random(seed)
+
+    for _ in range(20):
+        text = json.dumps(random_value(rng))
+        expected = reference_depths(text, max_depth)
+        for chunk_size in CHUNK_SIZES:
+            positions, depths = tumblr_lazy.bracket_depths(
+                text.encode("ascii"), max_depth, chunk_size)
+            assert list(zip(positions.tolist(), depths.tolist())) == expected
+
+
+@pytest.mark.parametrize("text", [
+    '["\\\\", "\\\\\\"", {"a": "]"}]',
+    '[' + '"' + '\\\\' * 5 + '", [{}]]',
+    '{"\\"": ["\\\\\\\\\\"}"]}',
+])
+def test_bracket_depths_backslash_runs(text):
+    for chunk_size in CHUNK_SIZES:
+        positions, depths = tumblr_lazy.bracket_depths(
+            text.encode("ascii"), 3, chunk_size)
+        assert list(zip(positions.tolist(), depths.tolist())) == \
+            reference_depths(text, 3)
+
+
+@pytest.fixture(scope = "module")
+def export(tmp_path_factory):
+    file_name = str(tmp_path_factory.mktemp("tumblr") / "tumblr.json")
+    synth.write_tumblr(file_name, 500, seed = 1)
+    return file_name
+
+
+def test_lazy_export_matches_load_file(export):
+    tumblr = parse_tumblr.load_file(export)
+    lazy = parse_tumblr.load_file(export, lazy = True)
+
+    assert list(lazy) == list(tumblr)
+    for key in tumblr:
+        assert lazy[key] == tumblr[key]
+
+
+def test_lazy_export_parses_on_access(export):
+    lazy = tumblr_lazy.LazyExport(export)
+    assert lazy.loaded() == []
+
+    key = next(iter(lazy))
+    assert lazy[key] is lazy[key]
+    assert lazy.loaded() == [key]
+
+
+def test_scan_sections_without_data(tmp_path):
+    file_name = tmp_path / "tumblr.json"
+    file_name.write_text('[{"name": "x", "other": {"a": [1]}}]')
+
+    with pytest.raises(ValueError):
+        tumblr_lazy.scan_sections(str(file_name))
@@ -0,0 +1,133 @@
+import json
+
+import pytest
+
+import ytd_loader
+
+
+DOCUMENTS = [
+    '{"impressions":[12345, 67890, 111]}',
+    '{"impressions": [-1.25e-3, 0, 3.14159, 1E+10, 98765432109876543210]}',
+    '{"impressions" : [ true , false , null , "]" , "\\"impressions\\": [9]" ]}',
+    '{"a": {"impressions": [{"x": [1, [2, {"y": "}"}]]}, {}]}, '
+    '"b": [{"impressions": [7, 8]}], "impressions": []}',
+    '{"impressions": [{"impressions": [1, 2]}, "caf\\u00e9 \\\\", 42]}',
+    'window.YTD.ad_impressions.part0 = [{"ad": {"impressions": [10, 200, 3000]}},'
+    ' {"ad": {"impressions": [{"advertiserInfo": {"screenName": "@a"}}]}}]',
+]
+
+TOP_LEVEL = [
+    '[1, 22, 333, 4444, 55555]',
+    '  [ {"endTime": "2021-01-01 00:00", "msPlayed": 123456}, [], "x", -0.5 ] ',
+    'window.YTD.tweets.part0 = [{"tweet": {"id": "1"}}, 12345678]',
+    '[]',
+]
+
+CHUNK_SIZES = [1, 2, 3, 4, 5, 7, 16, ytd_loader.CHUNK_SIZE]
+
+
+def expected_items(value, key):
+    '''
+    The elements iter_items should yield: those of every array under key, in
+    document order, without looking inside the elements themselves.
+    '''
+
+    if isinstance(value, dict):
+        for name, item in value.items():
+            if name == key and isinstance(item, list):
+                yield from item
+            else:
+                yield from expected_items(item, key)
+    elif isinstance(value, list):
+        for item in value:
+            yield from expected_items(item, key)
+
+
+def load(text):
+    match = ytd_loader.PREFIX.match(text.encode("utf-8"))
+    return json.loads(text[match.end():] if match else text)
+
+
+def write(tmp_path, text):
+    file_name = tmp_path / "data.js"
+    file_name.write_text(text, encoding = "utf-8")
+    return str(file_name)
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+@pytest.mark.parametrize("text", DOCUMENTS)
+def test_iter_items_matches_json_loads(tmp_path, text, chunk_size):
+    file_name = write(tmp_path, text)
+    items = list(ytd_loader.iter_items(file_name, chunk_size = chunk_size))
+
+    assert items == list(expected_items(load(text), "impressions"))
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+@pytest.mark.parametrize("text", TOP_LEVEL)
+def test_iter_items_top_level_array(tmp_path, text, chunk_size):
+    file_name = write(tmp_path, text)
+    items = list(ytd_loader.iter_items(file_name, key = None,
+                                       chunk_size = chunk_size))
+
+    assert items == load(text)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 8])
+def test_iter_items_unterminated_array(tmp_path, chunk_size):
+    file_name = write(tmp_path, '{"impressions": [1, 2, 3')
+
+    with pytest.raises(ValueError):
+        list(ytd_loader.iter_items(file_name, chunk_size = chunk_size))
+
+
+def ads_archive(num_ads):
+    ads = [{"ad": {"adsUserData": {"adImpressions": {"impressions": [
+        {"impressionTime": "2021-01-01 00:00:0{}".format(i), "advertiserInfo": {}}
+        for i in range(3)]}}}} for _ in range(num_ads)]
+    return "window.YTD.ad_impressions.part0 = " + json.dumps(ads, indent = 2)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 64, ytd_loader.CHUNK_SIZE])
+def test_iter_items_truncated_between_ads(tmp_path, chunk_size):
+    text = ads_archive(5)
+    # cut right after the third ad's closing brace
+    cut = len(text)
+    for _ in range(3):
+        cut = text.rindex('{\n    "ad"', 0, cut)
+    file_name = write(tmp_path, text[:cut].rstrip().rstrip(","))
+
+    with pytest.raises(ValueError, match = "truncated"):
+        list(ytd_loader.iter_items(file_name, chunk_size = chunk_size))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, ytd_loader.CHUNK_SIZE])
+@pytest.mark.parametrize("text", [
+    "this is not json at all",
+    "<html><body>Not Found</body></html>",
+    '{"ads": [1, 2, 3]}',
+    'window.YTD.ad_impressions.part0 = [{"ad": {}}]',
+])
+def test_iter_items_without_key_raises(tmp_path, text, chunk_size):
+    file_name = write(tmp_path, text)
+
+    with pytest.raises(ValueError):
+        list(ytd_loader.iter_items(file_name, chunk_size = chunk_size))
+
+
+@pytest.mark.parametrize("text", [
+    '{"impressions": [1]}}',
+    '{"impressions": [1], "a": "}"',
+])
+def test_iter_items_unbalanced_raises(tmp_path, text):
+    file_name = write(tmp_path, text)
+
+    with pytest.raises(ValueError):
+        list(ytd_loader.iter_items(file_name, chunk_size = 3))
+
+
+@pytest.mark.parametrize("text", ["window.YTD.ad_impressions.part0 = []", " {} "])
+def test_iter_items_empty_archive(tmp_path, text):
+    file_name = write(tmp_path, text)
+
+    assert list(ytd_loader.iter_items(file_name, chunk_size = 2)) == []
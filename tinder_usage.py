@@ -0,0 +1,139 @@
+import numpy as np
+import periods
+
+
+SERIES = ("app_opens", "messages_sent", "messages_received", "matches",
+          "swipes_likes", "swipes_passes")
+
+
+class Usage:
+    '''
+    Every Usage series of a Tinder export as daily NumPy arrays, aligned on
+    one shared range of days. Days missing from a series count as 0.
+
+    Attributes:
+        days: a datetime64[D] array with every day from the first to the last
+            day in any series
+        counts: a dictionary of series names to int64 arrays aligned with
+            days, one per name in SERIES
+        bounds: a dictionary of series names to (first, last) datetime64[D]
+            tuples, the range of days the export listed for that series, or
+            None for a series with no days
+    '''
+
+    def __init__(self, usage):
+        '''
+        Inputs:
+            usage: the "Usage" dictionary of a Tinder export, mapping series
+                names to dictionaries of date strings to counts
+        '''
+
+        parsed = dict()
+        for name in SERIES:
+            series = usage.get(name, {})
+            # keys are "YYYY-MM-DD", sometimes followed by a time
+            keys = np.array(list(series.keys()), dtype = "U10").astype("datetime64[D]")
+            values = np.fromiter(series.values(), dtype = np.int64, count = len(series))
+            parsed[name] = (keys, values)
+
+        nonempty = [keys for keys, _ in parsed.values() if len(keys)]
+        if nonempty:
+            start = min(keys.min() for keys in nonempty)
+            end = max(keys.max() for keys in nonempty)
+            self.days = np.arange(start, end + 1)
+        else:
+            self.days = np.zeros(0, dtype = "datetime64[D]")
+
+        self.counts = dict()
+        self.bounds = dict()
+        for name, (keys, values) in parsed.items():
+            column = np.zeros(len(self.days), dtype = np.int64)
+            if len(keys):
+                np.add.at(column, (keys - self.days[0]).view(np.int64), values)
+                self.bounds[name] = (keys.min(), keys.max())
+            else:
+                self.bounds[name] = None
+            self.counts[name] = column
+
+
+    def __len__(self):
+        return len(self.days)
+
+
+    def __getitem__(self, name):
+        return self.counts[name]
+
+
+    def totals(self):
+        '''
+        Lifetime totals of every series.
+
+        Outputs:
+            a dictionary of series names to integers
+        '''
+
+        return {name: int(column.sum()) for name, column in self.counts.items()}
+
+
+    def periods(self, freq):
+        '''
+        Truncates every day to the start of its period.
+
+        Inputs:
+            freq: "day", "week" or "month". Weeks start on Monday.
+
+        Outputs:
+            a datetime64 array aligned with days
+        '''
+
+        return periods.truncate(self.days, freq)
+
+
+    def resample(self, freq):
+        '''
+        Sums every series per week or month.
+
+        Inputs:
+            freq: "day", "week" or "month". Weeks start on Monday.
+
+        Outputs:
+            a tuple (periods, counts): a datetime64 array with the start of
+                each period, and a dictionary of series names to int64 arrays
+                aligned with it
+        '''
+
+        periods = self.periods(freq)
+        if len(periods) == 0:
+            return periods, {name: column.copy() for name, column in self.counts.items()}
+
+        # days are sorted, so each period is one contiguous run
+        starts = np.flatnonzero(np.append(True, periods[1:] != periods[:-1]))
+
+        return periods[starts], {name: np.add.reduceat(column, starts)
+                                 for name, column in self.counts.items()}
+
+
+    def rolling_match_rate(self, window = 7):
+        '''
+        Matches per like over a trailing window of days.
+
+        Inputs:
+            window: an integer, the number of days in each window, including
+                the current day
+
+        Outputs:
+            a tuple (days, rates): the datetime64[D] days array and a float64
+                array with the match rate ending on each day, NaN where the
+                window had no likes
+        '''
+
+        matches = np.cumsum(np.append(0, self.counts["matches"]))
+        likes = np.cumsum(np.append(0, self.counts["swipes_likes"]))
+        lag = np.maximum(np.arange(1, len(matches)) - window, 0)
+        window_matches = matches[1:] - matches[lag]
+        window_likes = likes[1:] - likes[lag]
+
+        with np.errstate(divide = "ignore", invalid = "ignore"):
+            rates = np.where(window_likes > 0, window_matches / window_likes, np.nan)
+
+        return self.days, rates
@@ -0,0 +1,187 @@
+import heapq
+import itertools
+
+
+class TopK:
+    '''
+    Keeps the k largest counts seen in a stream, using a bounded min-heap.
+    Ties are broken deterministically by first appearance: of two names with
+    the same count, the one pushed first ranks higher.
+    '''
+
+    def __init__(self, k):
+        self.k = k
+        self._heap = []
+        self._seq = itertools.count()
+
+
+    def push(self, name, count):
+        '''
+        Offers a (name, count) pair to the top k.
+
+        Inputs:
+            name: a hashable name, e.g. a company handle or song title
+            count: a number, the count or time associated with name
+        '''
+
+        if self.k <= 0:
+            return
+
+        # later entries sort lower, so they are evicted first on ties
+        entry = (count, -next(self._seq), name)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry > self._heap[0]:
+            heapq.heapreplace(self._heap, entry)
+
+
+    def items(self):
+        '''
+        Returns the current top k.
+
+        Outputs:
+            a list of (count, name) tuples, largest count first
+        '''
+
+        return [(count, name) for count, _, name in
+                sorted(self._heap, reverse=True)]
+
+
+def top_k(counts, k):
+    '''
+    Exact top k of a dictionary of counts, or of an iterable of (name, count)
+    pairs. Ties are broken by first appearance.
+
+    Inputs:
+        counts: a dictionary of names to counts, or an iterable of pairs
+        k: an integer, the desired number of top entries
+
+    Outputs:
+        a list of (count, name) tuples, largest count first
+    '''
+
+    if hasattr(counts, "items"):
+        counts = counts.items()
+
+    top = TopK(k)
+    for name, count in counts:
+        top.push(name, count)
+
+    return top.items()
+
+
+class SpaceSaving:
+    '''
+    Approximate heavy hitters of a stream in bounded memory (Metwally et al.'s
+    Space-Saving algorithm). At most capacity names are tracked; when a new
+    name arrives and the table is full, it replaces the name with the smallest
+    count and inherits that count as its error. Every name whose true count
+    exceeds total / capacity is guaranteed to be tracked, and each reported
+    count overestimates the true count by at most its error.
+    '''
+
+    def __init__(self, capacity):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.total = 0
+        self._counts = dict()
+        self._errors = dict()
+        # lazy min-heap of (count, seq, name), stale entries are skipped
+        self._heap = []
+        self._seq = itertools.count()
+
+
+    def add(self, name, count=1):
+        '''
+        Counts count more occurrences of name.
+
+        Inputs:
+            name: a hashable name, e.g. a targeting value or track
+            count: a positive integer, 1 by default
+        '''
+
+        self.total += count
+
+        if name in self._counts:
+            self._counts[name] += count
+        elif len(self._counts) < self.capacity:
+            self._counts[name] = count
+            self._errors[name] = 0
+        else:
+            low, low_name = self._pop_min()
+            del self._counts[low_name]
+            del self._errors[low_name]
+            self._counts[name] = low + count
+            self._errors[name] = low
+
+        heapq.heappush(self._heap, (self._counts[name], next(self._seq), name))
+        if len(self._heap) > 4 * self.capacity:
+            self._compact()
+
+
+    def update(self, stream):
+        '''
+        Counts every name in an iterable.
+
+        Inputs:
+            stream: an iterable of hashable names
+
+        Outputs:
+            self, so calls can be chained
+        '''
+
+        for name in stream:
+            self.add(name)
+
+        return self
+
+
+    def _pop_min(self):
+        while True:
+            count, _, name = heapq.heappop(self._heap)
+            if self._counts.get(name) == count:
+                return count, name
+
+
+    def _compact(self):
+        self._heap = [(count, next(self._seq), name)
+                      for name, count in self._counts.items()]
+        heapq.heapify(self._heap)
+
+
+    def error(self, name):
+        '''
+        The maximum overestimate of name's count, 0 if counted exactly.
+        '''
+
+        return self._errors[name]
+
+
+    def top(self, k):
+        '''
+        Returns the approximate top k.
+
+        Outputs:
+            a list of (count, name) tuples, largest count first. Counts are
+                upper bounds on the true counts.
+        '''
+
+        return top_k(self._counts, k)
+
+
+def approx_top_k(stream, k, capacity):
+    '''
+    Approximate top k of a stream of names, too large to count exactly.
+
+    Inputs:
+        stream: an iterable of hashable names
+        k: an integer, the desired number of top entries
+        capacity: an integer, the number of names tracked at once. Should be
+            comfortably larger than k.
+
+    Outputs:
+        a list of (count, name) tuples, largest count first
+    '''
+
+    return SpaceSaving(capacity).update(stream).top(k)
@@ -0,0 +1,149 @@
+import numpy as np
+import tumblr_dates
+
+
+SOURCES = ("ads_analytics", "gemini_analytics", "client_side_ad_analytics")
+
+
+class AdAnalytics:
+    '''
+    Every ad Tumblr served from the three ad sources of an export, built in
+    one pass into flat arrays. Counts, rates and daily series are array
+    reductions over them, optionally restricted to one source.
+
+    Attributes:
+        sources: a tuple of the source names, indexed by source id
+        source: an int8 array with the source id of each ad
+        days: a datetime64[D] array with the day each ad was served, NaT
+            where the export has no serve time
+        viewed: a bool array, whether each ad was viewed
+        interacted: a bool array, whether each ad was interacted with
+    '''
+
+    def __init__(self, tumblr, sources = SOURCES):
+        '''
+        Inputs:
+            tumblr: a json loaded file from parse_tumblr.load_file
+            sources: a sequence of ad section names. Sections missing from
+                the export count as empty.
+        '''
+
+        self.sources = tuple(sources)
+        sizes = []
+        serve_times = []
+        viewed = []
+        interacted = []
+
+        for name in self.sources:
+            ads = tumblr[name] if name in tumblr else []
+            sizes.append(len(ads))
+            for ad in ads:
+                serve_times.append(ad["serve_time"])
+                viewed.append(ad["viewed"])
+                interacted.append(ad["interacted"])
+
+        self.source = np.repeat(np.arange(len(sizes), dtype = np.int8), sizes)
+        self.days = tumblr_dates.to_dates(serve_times)
+        self.viewed = np.array(viewed, dtype = "U5") == "true"
+        self.interacted = np.array(interacted, dtype = "U5") == "true"
+
+
+    def __len__(self):
+        return len(self.source)
+
+
+    def _mask(self, source):
+        if source is None:
+            return np.ones(len(self), dtype = bool)
+
+        return self.source == self.sources.index(source)
+
+
+    def earliest(self, source = None):
+        '''
+        The first day an ad was served, as a datetime.date, or None if no ad
+        has a serve time.
+
+        Inputs:
+            source: an optional source name to only look at that source
+        '''
+
+        mask = self._mask(source) & ~np.isnat(self.days)
+        if not mask.any():
+            return None
+
+        return self.days[mask].min().item()
+
+
+    def summary(self, source = None):
+        '''
+        Counts of served, viewed, unseen and interacted ads.
+
+        Inputs:
+            source: an optional source name to only count that source
+
+        Outputs:
+            a dictionary with the integer counts served, viewed, unseen and
+                interacted, and the float rates view_through (viewed per
+                served) and interaction (interacted per viewed). A rate is
+                None when nothing was served or viewed.
+        '''
+
+        mask = self._mask(source)
+        served = int(mask.sum())
+        viewed = int(self.viewed[mask].sum())
+        interacted = int(self.interacted[mask].sum())
+
+        return {
+            "served": served,
+            "viewed": viewed,
+            "unseen": served - viewed,
+            "interacted": interacted,
+            "view_through": viewed / served if served else None,
+            "interaction": interacted / viewed if viewed else None,
+        }
+
+
+    def by_source(self):
+        '''
+        The summary of every source and of all sources combined.
+
+        Outputs:
+            a dictionary of source names, and "all", to summary dictionaries
+        '''
+
+        summaries = {name: self.summary(name) for name in self.sources}
+        summaries["all"] = self.summary()
+
+        return summaries
+
+
+    def daily(self, source = None):
+        '''
+        Served, viewed and interacted ads per day, from the first to the last
+        day with a serve time. Days without ads are included with 0. Ads
+        without a serve time are left out.
+
+        Inputs:
+            source: an optional source name to only count that source
+
+        Outputs:
+            a tuple (days, served, viewed, interacted): a datetime64[D] array
+                and three int64 arrays
+        '''
+
+        mask = self._mask(source) & ~np.isnat(self.days)
+        days = self.days[mask]
+        if len(days) == 0:
+            empty = np.zeros(0, dtype = np.int64)
+            return days, empty, empty.copy(), empty.copy()
+
+        start = days.min()
+        offsets = (days - start).view(np.int64)
+        length = offsets.max() + 1
+
+        served = np.bincount(offsets, minlength = length)
+        viewed = np.bincount(offsets[self.viewed[mask]], minlength = length)
+        interacted = np.bincount(offsets[self.interacted[mask]], minlength = length)
+
+        return start + np.arange(length), served, viewed, interacted
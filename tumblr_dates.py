@@ -0,0 +1,160 @@
+import numpy as np
+import periods
+
+
+NULL = "\\N"
+# sections with timestamps, and the field holding them (None for plain lists)
+DATE_FIELDS = {
+    "dashboard": "serve_time",
+    "ads_analytics": "serve_time",
+    "gemini_analytics": "serve_time",
+    "client_side_ad_analytics": "serve_time",
+    "last_active_times": None,
+}
+
+
+def to_dates(values):
+    '''
+    Converts date strings to a datetime64[D] array in one pass. Strings start
+    with "YYYY-MM-DD", anything after the day is ignored, and the "\\N"
+    placeholder Tumblr uses for missing dates becomes NaT.
+
+    Inputs:
+        values: a sequence of strings
+
+    Outputs:
+        a datetime64[D] array
+    '''
+
+    days = np.array(values, dtype = "U10")
+    days[days == NULL] = "NaT"
+
+    return days.astype("datetime64[D]")
+
+
+class DateColumn:
+    '''
+    The dates of one timestamped Tumblr section as a datetime64[D] array,
+    with missing dates as NaT. Reductions skip missing dates.
+
+    Attributes:
+        days: a datetime64[D] array, one entry per record
+        valid: a bool array, False where the date was missing
+    '''
+
+    def __init__(self, values):
+        '''
+        Inputs:
+            values: a sequence of date strings, see to_dates
+        '''
+
+        self.days = to_dates(values)
+        self.valid = ~np.isnat(self.days)
+
+
+    @classmethod
+    def from_section(cls, tumblr, section):
+        '''
+        Builds the column for one of the sections in DATE_FIELDS.
+
+        Inputs:
+            tumblr: a json loaded file from parse_tumblr.load_file
+            section: a key of DATE_FIELDS
+        '''
+
+        field = DATE_FIELDS[section]
+        records = tumblr[section]
+        if field is None:
+            return cls(records)
+
+        return cls([record[field] for record in records])
+
+
+    def __len__(self):
+        return len(self.days)
+
+
+    def num_valid(self):
+        '''
+        The number of records with a date.
+        '''
+
+        return int(self.valid.sum())
+
+
+    def min(self):
+        '''
+        The earliest date as a datetime.date, or None if every date is
+        missing.
+        '''
+
+        if not self.valid.any():
+            return None
+
+        return self.days[self.valid].min().item()
+
+
+    def max(self):
+        '''
+        The latest date as a datetime.date, or None if every date is missing.
+        '''
+
+        if not self.valid.any():
+            return None
+
+        return self.days[self.valid].max().item()
+
+
+    def between(self, start = None, end = None):
+        '''
+        Which records fall in a range of days.
+
+        Inputs:
+            start: an optional first day, a datetime.date or "YYYY-MM-DD"
+            end: an optional last day, included in the range
+
+        Outputs:
+            a bool array aligned with the records, always False for missing
+                dates
+        '''
+
+        mask = self.valid.copy()
+        if start is not None:
+            mask &= self.days >= np.datetime64(start, "D")
+        if end is not None:
+            mask &= self.days <= np.datetime64(end, "D")
+
+        return mask
+
+
+    def counts(self, freq = "day"):
+        '''
+        Counts records per day, week or month, from the first to the last
+        period with a date. Periods without records are included with 0.
+
+        Inputs:
+            freq: "day", "week" or "month". Weeks start on Monday.
+
+        Outputs:
+            a tuple (periods, counts): a datetime64 array with the start of
+                each period and an int64 array
+        '''
+
+        days = periods.truncate(self.days[self.valid], freq)
+
+        return periods.series(days, step = 7 if freq == "week" else 1)
+
+
+def columns(tumblr):
+    '''
+    Builds a DateColumn for every timestamped section of a tumblr file.
+
+    Inputs:
+        tumblr: a json loaded file from parse_tumblr.load_file
+
+    Outputs:
+        a dictionary of section names to DateColumns
+    '''
+
+    return {section: DateColumn.from_section(tumblr, section)
+            for section in DATE_FIELDS}
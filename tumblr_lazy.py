@@ -0,0 +1,255 @@
+import bisect
+import collections.abc
+import json
+import mmap
+import re
+import numpy as np
+
+
+WHITESPACE = re.compile(rb"\s*")
+STRING = re.compile(rb'"(?:[^"\\]++|\\.)*+"', re.DOTALL)
+SCALAR = re.compile(rb'"(?:[^"\\]++|\\.)*+"|[^\s,\]}]++', re.DOTALL)
+OPENERS = b"[{"
+CHUNK_SIZE = 1 << 22
+# sections sit at depth 3: the export list, its first object, and "data"
+SECTION_DEPTH = 3
+
+
+def _escaped(quote_at, backslash_at, carried):
+    '''
+    Which quotes are escaped, i.e. follow an odd run of backslashes. carried
+    is the length of the backslash run that ended the previous chunk.
+    '''
+
+    if len(backslash_at) == 0:
+        return (quote_at == 0) & (carried % 2 == 1)
+
+    new_run = np.ones(len(backslash_at), dtype = bool)
+    new_run[1:] = backslash_at[1:] != backslash_at[:-1] + 1
+    run_start = np.maximum.accumulate(np.where(new_run, backslash_at, -1))
+
+    i = np.minimum(np.searchsorted(backslash_at, quote_at - 1), len(backslash_at) - 1)
+    preceded = backslash_at[i] == quote_at - 1
+    run = quote_at - run_start[i] + np.where(run_start[i] == 0, carried, 0)
+    run = np.where(preceded, run, np.where(quote_at == 0, carried, 0))
+
+    return run % 2 == 1
+
+
+def bracket_depths(buf, max_depth, chunk_size = CHUNK_SIZE):
+    '''
+    Finds every bracket outside of a json string, together with the nesting
+    depth after it, keeping only brackets that open or close a container
+    nested at most max_depth deep. The buffer is processed in fixed-size
+    chunks: a few vectorized comparisons per byte pick out quotes,
+    backslashes and brackets, and everything after works on those positions
+    alone, so huge sections cost no Python-level steps.
+
+    Inputs:
+        buf: a bytes-like object holding json
+        max_depth: an integer, the deepest level whose containers are kept
+        chunk_size: an integer, the bytes processed per pass
+
+    Outputs:
+        a tuple (positions, depths) of int64 arrays
+    '''
+
+    positions = []
+    depths = []
+    # state carried across chunks
+    backslashes = 0
+    quotes = 0
+    depth = 0
+
+    for offset in range(0, len(buf), chunk_size):
+        chunk = np.frombuffer(buf, dtype = np.uint8,
+                              count = min(chunk_size, len(buf) - offset),
+                              offset = offset)
+        # "[" | 32 is "{" and "]" | 32 is "}"
+        folded = chunk | 32
+        special_at = np.flatnonzero((folded == 123) | (folded == 125) |
+                                    (chunk == 34) | (chunk == 92))
+        special = chunk[special_at]
+
+        is_quote = special == 34
+        is_backslash = special == 92
+        real = is_quote.copy()
+        if backslashes or is_backslash.any():
+            real[is_quote] = ~_escaped(special_at[is_quote],
+                                       special_at[is_backslash], backslashes)
+        num_quotes = np.cumsum(real) + quotes
+
+        bracket = ~(is_quote | is_backslash) & (num_quotes % 2 == 0)
+        bracket_at = special_at[bracket]
+        opening = (special[bracket] | 32) == 123
+        after = depth + np.cumsum(np.where(opening, 1, -1))
+
+        keep = after - opening <= max_depth
+        positions.append(bracket_at[keep] + offset)
+        depths.append(after[keep])
+
+        backslash_at = special_at[is_backslash]
+        if len(backslash_at) and backslash_at[-1] == len(chunk) - 1:
+            run = np.flatnonzero(np.diff(backslash_at) != 1)
+            first = backslash_at[run[-1] + 1] if len(run) else backslash_at[0]
+            backslashes = len(chunk) - first + (backslashes if first == 0 else 0)
+        else:
+            backslashes = 0
+        if len(num_quotes):
+            quotes = num_quotes[-1]
+        if len(after):
+            depth = after[-1]
+
+    if not positions:
+        return np.zeros(0, dtype = np.int64), np.zeros(0, dtype = np.int64)
+
+    return np.concatenate(positions), np.concatenate(depths)
+
+
+class _Scanner:
+    '''
+    Walks the outer levels of a json document, jumping over containers with
+    a bracket_depths index instead of reading them.
+    '''
+
+    def __init__(self, buf, max_depth):
+        self.buf = buf
+        self.positions, self.depths = bracket_depths(buf, max_depth)
+        self.positions = self.positions.tolist()
+        self.depths = self.depths.tolist()
+
+
+    def skip_whitespace(self, pos):
+        return WHITESPACE.match(self.buf, pos).end()
+
+
+    def expect(self, pos, char):
+        pos = self.skip_whitespace(pos)
+        if self.buf[pos:pos + 1] != char:
+            raise ValueError("expected {!r} at byte {}".format(char.decode(), pos))
+
+        return pos + 1
+
+
+    def skip_value(self, pos):
+        '''
+        Finds the end of the json value starting at pos without decoding it.
+        '''
+
+        if self.buf[pos] not in OPENERS:
+            match = SCALAR.match(self.buf, pos)
+            if match is None or match.end() == pos:
+                raise ValueError("expected a value at byte {}".format(pos))
+            return match.end()
+
+        i = bisect.bisect_left(self.positions, pos)
+        if i == len(self.positions) or self.positions[i] != pos:
+            raise ValueError("container at byte {} is nested too deep".format(pos))
+        outer = self.depths[i] - 1
+        for j in range(i + 1, len(self.positions)):
+            if self.depths[j] == outer:
+                return self.positions[j] + 1
+
+        raise ValueError("unterminated value at byte {}".format(pos))
+
+
+    def members(self, pos):
+        '''
+        Yields (key, start, end) for every member of the json object starting
+        at pos, where start and end are the byte span of the member's value.
+        '''
+
+        pos = self.skip_whitespace(self.expect(pos, b"{"))
+        if self.buf[pos:pos + 1] == b"}":
+            return
+
+        while True:
+            match = STRING.match(self.buf, self.skip_whitespace(pos))
+            if match is None:
+                raise ValueError("expected a key at byte {}".format(pos))
+            key = json.loads(match.group())
+            start = self.skip_whitespace(self.expect(match.end(), b":"))
+            end = self.skip_value(start)
+            yield key, start, end
+
+            pos = self.skip_whitespace(end)
+            if self.buf[pos:pos + 1] == b"}":
+                return
+            pos = self.expect(pos, b",")
+
+
+def scan_sections(file_name):
+    '''
+    Records where each section of a tumblr export sits in the file, without
+    parsing any of them.
+
+    Inputs:
+        file_name: a .json file with your tumblr data
+
+    Outputs:
+        a dictionary of section names (the keys of tumblr[0]["data"]) to
+            (start, end) byte offsets of their values, in file order
+    '''
+
+    with open(file_name, "rb") as f, \
+            mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ) as buf:
+        scanner = _Scanner(buf, SECTION_DEPTH)
+        pos = scanner.expect(0, b"[")
+        for key, start, end in scanner.members(pos):
+            if key == "data":
+                return {key: (start, end) for key, start, end in scanner.members(start)}
+
+    raise ValueError("{} has no data section".format(file_name))
+
+
+class LazyExport(collections.abc.Mapping):
+    '''
+    Read-only view of tumblr[0]["data"] that parses each section the first
+    time it is accessed and keeps it for later accesses, so a query that only
+    needs most_used_tags never decodes the dashboard or the ad analytics.
+
+    It can be passed anywhere parse_tumblr expects the return of load_file.
+
+    Attributes:
+        file_name: the tumblr export
+        offsets: a dictionary of section names to (start, end) byte offsets,
+            see scan_sections
+    '''
+
+    def __init__(self, file_name, offsets = None):
+        '''
+        Inputs:
+            file_name: a .json file with your tumblr data
+            offsets: optional section offsets from an earlier scan_sections
+                of the same file. Scanned from the file when omitted.
+        '''
+
+        self.file_name = file_name
+        self.offsets = scan_sections(file_name) if offsets is None else offsets
+        self._sections = dict()
+
+
+    def __getitem__(self, key):
+        if key not in self._sections:
+            start, end = self.offsets[key]
+            with open(self.file_name, "rb") as f:
+                f.seek(start)
+                self._sections[key] = json.loads(f.read(end - start))
+
+        return self._sections[key]
+
+
+    def __iter__(self):
+        return iter(self.offsets)
+
+
+    def __len__(self):
+        return len(self.offsets)
+
+
+    def loaded(self):
+        '''
+        The names of the sections parsed so far.
+        '''
+
+        return list(self._sections)
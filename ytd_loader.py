@@ -0,0 +1,275 @@
+import codecs
+import json
+import mmap
+import os
+import re
+
+
+PREFIX = re.compile(rb"\s*window\.YTD\.(\w+)\.part(\d+)\s*=")
+HEADER_SIZE = 256
+CHUNK_SIZE = 1 << 16
+SEPARATORS = re.compile(r"[\s,]*")
+# the characters that can follow an array element
+END_OF_ITEM = frozenset(" \t\n\r,]")
+# what iter_items looks at outside the arrays it yields from
+STRUCTURE = re.compile(r'["\[\]{}]')
+STRING = re.compile(r'"(?:[^"\\]|\\.)*"', re.DOTALL)
+KEY_TAIL = re.compile(r"\s*:\s*\[")
+PARTIAL_KEY_TAIL = re.compile(r"\s*(?::\s*)?\Z")
+
+
+def read_header(file_name):
+    '''
+    Reads the "window.YTD.<name>.partN =" prefix of a Twitter archive file.
+
+    Inputs:
+        file_name: name of a .js file from a Twitter archive
+
+    Outputs:
+        a tuple (name, part), e.g. ("ad_impressions", 0), or None if the file
+            doesn't start with a YTD prefix.
+    '''
+
+    with open(file_name, "rb") as f:
+        match = PREFIX.match(f.read(HEADER_SIZE))
+
+    if match is None:
+        return None
+
+    return match.group(1).decode("ascii"), int(match.group(2))
+
+
+def load_part(file_name):
+    '''
+    Loads a single Twitter archive file without modifying it. The file is
+    memory-mapped and parsed from just past the "window.YTD.<name>.partN ="
+    prefix, so nothing is rewritten on disk. Files that were already stripped
+    of their prefix load as plain json.
+
+    Inputs:
+        file_name: name of a .js file from a Twitter archive
+
+    Outputs:
+        a readable json, the same as calling json.loads on the stripped file
+    '''
+
+    with open(file_name, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return []
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            match = PREFIX.match(mm, 0, HEADER_SIZE)
+            start = match.end() if match else 0
+            # decode straight out of the mapping, json only accepts str/bytes
+            with memoryview(mm) as view:
+                text, _ = codecs.utf_8_decode(view[start:], "strict", True)
+
+    return json.loads(text)
+
+
+def find_datasets(directory):
+    '''
+    Finds every YTD dataset in a Twitter archive directory.
+
+    Inputs:
+        directory: the "data" directory of a Twitter archive
+
+    Outputs:
+        a dictionary mapping dataset names (e.g. "ad_impressions") to lists of
+            file names, sorted by part number.
+    '''
+
+    datasets = dict()
+
+    for entry in os.scandir(directory):
+        if not entry.is_file() or not entry.name.endswith(".js"):
+            continue
+        header = read_header(entry.path)
+        if header is None:
+            continue
+        name, part = header
+        datasets.setdefault(name, []).append((part, entry.path))
+
+    return {name: [path for _, path in sorted(parts)]
+            for name, parts in datasets.items()}
+
+
+def find_parts(directory, name):
+    '''
+    Finds every partN file of a single YTD dataset.
+
+    Inputs:
+        directory: the "data" directory of a Twitter archive
+        name: a dataset name, e.g. "ad_impressions" or "ad_engagements"
+
+    Outputs:
+        a list of file names, sorted by part number
+    '''
+
+    return find_datasets(directory).get(name, [])
+
+
+def load_dataset(path, name="ad_impressions"):
+    '''
+    Loads a YTD dataset. If path is a directory, every partN file of the
+    dataset found there is loaded and concatenated in part order.
+
+    Inputs:
+        path: a single archive file, or the "data" directory of an archive
+        name: a dataset name, only used when path is a directory
+
+    Outputs:
+        a readable json list with the entries of every part
+    '''
+
+    if not os.path.isdir(path):
+        return load_part(path)
+
+    entries = []
+    for file_name in find_parts(path, name):
+        entries.extend(load_part(file_name))
+
+    return entries
+
+
+def iter_items(file_name, key = "impressions", chunk_size = CHUNK_SIZE):
+    '''
+    Incrementally parses a json (or YTD-prefixed) file, yielding the elements
+    of every array stored under key, one at a time. Only one chunk of the
+    file and the element being decoded are held in memory, so peak memory
+    doesn't grow with the size of the file.
+
+    Outside those arrays only the structure is checked: brackets and braces
+    must balance, so a truncated file raises instead of ending early. A file
+    without any array under key raises too, unless it is an empty "[]" or
+    "{}" archive.
+
+    Inputs:
+        file_name: name of a json or YTD archive file
+        key: a string, the object key whose array elements are yielded, or
+            None to yield the elements of the file's top-level array
+        chunk_size: an integer, the number of characters read at a time
+
+    Outputs:
+        a generator of decoded array elements
+
+    Raises:
+        ValueError (json.JSONDecodeError for bad elements) if the file isn't
+            well-formed json or has no array under key
+    '''
+
+    decoder = json.JSONDecoder()
+    quoted_key = None if key is None else '"{}"'.format(key)
+
+    with open(file_name, "r", encoding = "utf-8") as f:
+        buf = ""
+        pos = 0
+        eof = False
+        in_array = False
+        # open containers around pos, and how many were opened in all
+        depth = 0
+        containers = 0
+        found = False
+        has_strings = False
+
+        while True:
+            if not in_array:
+                match = STRUCTURE.search(buf, pos)
+                if match is None:
+                    pos = len(buf)
+                    if eof:
+                        break
+                elif match.group() == '"':
+                    string = STRING.match(buf, match.start())
+                    if string is not None:
+                        has_strings = True
+                        pos = string.end()
+                        if string.group() != quoted_key:
+                            continue
+                        tail = KEY_TAIL.match(buf, pos)
+                        if tail is not None:
+                            pos = tail.end()
+                            depth += 1
+                            containers += 1
+                            in_array = found = True
+                            continue
+                        if eof or PARTIAL_KEY_TAIL.match(buf, pos) is None:
+                            continue
+                    elif eof:
+                        raise ValueError("unterminated string in {}".format(file_name))
+                    # the string, or what follows a key, goes on in the next
+                    # chunk
+                    pos = match.start()
+                elif match.group() in "[{":
+                    pos = match.end()
+                    depth += 1
+                    containers += 1
+                    if key is None and depth == 1 and match.group() == "[":
+                        in_array = found = True
+                    continue
+                else:
+                    pos = match.end()
+                    depth -= 1
+                    if depth < 0:
+                        raise ValueError("unbalanced {!r} in {}".format(
+                            match.group(), file_name))
+                    continue
+            else:
+                pos = SEPARATORS.match(buf, pos).end()
+                if pos < len(buf):
+                    if buf[pos] == "]":
+                        pos += 1
+                        depth -= 1
+                        in_array = False
+                        continue
+                    try:
+                        item, end = decoder.raw_decode(buf, pos)
+                    except json.JSONDecodeError:
+                        if eof:
+                            raise
+                    else:
+                        # a number cut by the end of the buffer still
+                        # decodes ("12" of "12345", "1.5" of "1.5e3"), so an
+                        # element is only complete once what follows it is
+                        # buffered too
+                        if eof or (end < len(buf) and buf[end] in END_OF_ITEM):
+                            pos = end
+                            yield item
+                            continue
+                elif eof:
+                    raise ValueError("unterminated array in {}".format(file_name))
+
+            # out of buffered input: drop what was consumed and read on
+            buf = buf[pos:]
+            pos = 0
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buf += chunk
+
+    if depth > 0:
+        raise ValueError("truncated json in {}: {} unclosed containers".format(
+            file_name, depth))
+    if not found and (containers != 1 or has_strings):
+        raise ValueError("no {} array in {}".format(
+            "top-level" if key is None else quoted_key, file_name))
+
+
+def iter_impressions(path):
+    '''
+    Streams every ad impression of an archive, one at a time, see iter_items.
+
+    Inputs:
+        path: an ad-impressions file, or an archive's data directory to
+            stream every ad_impressions part in it
+
+    Outputs:
+        a generator of impression dictionaries
+    '''
+
+    if os.path.isdir(path):
+        files = find_parts(path, "ad_impressions")
+    else:
+        files = [path]
+
+    for file_name in files:
+        yield from iter_items(file_name, "impressions")